@@ -18,7 +18,7 @@
 
 build_python_lambda() {
     rm -r dist 2>/dev/null
-    rsync -av --exclude=.venv/ --exclude=.vscode --exclude=.pylintrc --exclude=local_requirements.txt * dist >/dev/null
+    rsync -av --exclude=.venv/ --exclude=.vscode --exclude=.pylintrc --exclude=local_requirements.txt --exclude=benchmarks/ --exclude=tests/ * dist >/dev/null
     cd dist
 
     python3.11 -m venv .venv --upgrade-deps
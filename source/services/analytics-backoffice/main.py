@@ -8,6 +8,8 @@ from blueprints.applications import applications_endpoints
 from blueprints.audiences import audiences_endpoints
 from blueprints.history import history_endpoints
 from blueprints.remote_configs import remote_configs_endpoints
+from models.Application import Application
+from models.RemoteConfig import RemoteConfig
 
 
 app = FlaskApp(__name__)
@@ -17,6 +19,21 @@ app.register_blueprint(history_endpoints, url_prefix="/history")
 app.register_blueprint(remote_configs_endpoints, url_prefix="/remote-configs")
 
 
+@app.cli.command("index-applications")
+def index_applications():
+    """
+    One-off backfill of remote-configs-applications table : every existing application
+    is indexed, remote-configs Lambda no longer scans remote configs for any of them.
+    Run it locally (run.bash environment) : `flask --app main index-applications`.
+    """
+    RemoteConfig.index_all_applications(
+        [
+            application.to_dict()["application_id"]
+            for application in Application.get_all()
+        ]
+    )
+
+
 if __name__ == "__main__":
     # Used when running locally.
     app.run(host="localhost", port=8080, debug=True)
@@ -40,6 +40,7 @@ class ABTest:
 
     def __assert_data(self, data: dict[str, Any]):
         to_assert = data.copy()
+        salt = to_assert.pop("salt", "")
         target_user_percent = to_assert.pop("target_user_percent")
         variants = to_assert.pop("variants")
 
@@ -47,6 +48,7 @@ class ABTest:
             target_user_percent = int(target_user_percent)
             data["target_user_percent"] = target_user_percent
 
+        assert isinstance(salt, str), "`salt` should be string"
         assert (
             isinstance(target_user_percent, int) and 0 <= target_user_percent <= 100
         ), "`target_user_percent` should be integer between 0 and 100"
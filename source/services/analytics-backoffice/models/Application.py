@@ -2,14 +2,14 @@
 This module contains Application class.
 """
 
-from datetime import datetime
-from time import sleep
+from datetime import datetime, timezone
 from typing import Any, List
 
 from boto3.dynamodb.conditions import Attr
 
 from FlaskApp import current_app
 from utils import constants
+from utils.athena import partition_predicate, run_queries, succeeded
 
 
 class Application:
@@ -90,39 +90,31 @@ class Application:
         """
         This method returns latest events of application.
         """
-        now = datetime.now()
-        # Start Athena Query
-        response = current_app.athena.start_query_execution(
-            QueryString=f"""
-                SELECT *
-                FROM {constants.ANALYTICS_TABLE}
-                WHERE application_name='{self.application_name}' AND year='{now.year}' AND month='{now.month}' AND day='{now.day}'
-                ORDER BY event_timestamp DESC
-                LIMIT {limit}
-            """,
-            QueryExecutionContext={"Database": constants.ANALYTICS_DATABASE},
-            ResultConfiguration={
-                "OutputLocation": f"s3://{constants.ANALYTICS_BUCKET}/athena_query_results/"
+        today = datetime.now(timezone.utc).date()
+        query_execution = run_queries(
+            current_app.athena,
+            {
+                self.application_name: f"""
+                    SELECT *
+                    FROM {constants.ANALYTICS_TABLE}
+                    WHERE application_name='{self.application_name}' AND ({partition_predicate(today, today)})
+                    ORDER BY event_timestamp DESC
+                    LIMIT {limit}
+                """
             },
-        )
-        query_execution_id = response["QueryExecutionId"]
-        while True:
-            # Wait for the query to be executed
-            sleep(0.5)  # To avoid spamming requests
-            query_status = current_app.athena.get_query_execution(
-                QueryExecutionId=query_execution_id
-            )["QueryExecution"]["Status"]
-            if query_status["State"] not in ("QUEUED", "RUNNING"):
-                break
-
-        if query_status == "FAILED":
+            constants.ANALYTICS_DATABASE,
+            f"s3://{constants.ANALYTICS_BUCKET}/athena_query_results/",
+            constants.ATHENA_RESULTS_MAX_AGE_MINUTES,
+        )[self.application_name]
+
+        if not succeeded(query_execution):
             raise ValueError(
-                f"Error during Athena query execution : {query_status['StateChangeReason']}"
+                f"Error during Athena query execution : {query_execution['Status'].get('StateChangeReason')}"
             )
 
         # Get Athena Query Results
         query_results = current_app.athena.get_query_results(
-            QueryExecutionId=response["QueryExecutionId"]
+            QueryExecutionId=query_execution["QueryExecutionId"]
         )
         result_set = query_results["ResultSet"]
 
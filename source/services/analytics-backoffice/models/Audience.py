@@ -44,7 +44,23 @@ class Audience:
         """
         print(Audience.__table_audiences())
         response = Audience.__table_audiences().scan()
-        return [Audience(item) for item in response["Items"]]
+        return [
+            Audience(item)
+            for item in response["Items"]
+            if item["audience_name"] != constants.AUDIENCES_VERSION_NAME
+        ]
+
+    @staticmethod
+    def increase_version():
+        """
+        This static method increases the version of audiences definitions : every
+        remote-configs Lambda container reloads audiences once its cache expired.
+        """
+        Audience.__table_audiences().update_item(
+            Key={"audience_name": constants.AUDIENCES_VERSION_NAME},
+            UpdateExpression="ADD audiences_version :one",
+            ExpressionAttributeValues={":one": 1},
+        )
 
     @property
     def audience_name(self) -> str:
@@ -80,6 +96,7 @@ class Audience:
         """
         table = Audience.__table_audiences()
         table.delete_item(Key={"audience_name": self.audience_name})
+        Audience.increase_version()
 
         history_item = HistoryItem(
             method="DELETE", old_item=self.__item, table_name=table.table_name
@@ -97,6 +114,7 @@ class Audience:
         This method updates RemoteConfigCondition to database.
         """
         Audience.__table_audiences().put_item(Item=self.__item)
+        Audience.increase_version()
 
     def __assert_data(self, data: dict[str, Any]):
         data = data.copy()
@@ -108,6 +126,9 @@ class Audience:
         assert (
             isinstance(audience_name, str) and audience_name != ""
         ), "`audience_name` should be non-empty string"
+        assert (
+            audience_name != constants.AUDIENCES_VERSION_NAME
+        ), f"`audience_name` {audience_name} is reserved"
         assert (
             isinstance(condition, str) and audience_name != ""
         ), "`condition_value` should be non-empty string"
@@ -108,7 +108,39 @@ class HistoryItem:
         """
         This method retores HistoryItem.
         """
-        current_app.database.Table(self.table_name).put_item(Item=self.old_item)
+        table = current_app.database.Table(self.table_name)
+
+        if self.table_name in (
+            constants.TABLE_AUDIENCES_PROD,
+            constants.TABLE_AUDIENCES_SANDBOX,
+        ):
+            table.put_item(Item=self.old_item)
+            # Imported here because Audience module already imports this one.
+            # pylint: disable=import-outside-toplevel
+            from models.Audience import Audience
+
+            Audience.increase_version()
+            return
+
+        if self.table_name != constants.TABLE_REMOTE_CONFIGS:
+            table.put_item(Item=self.old_item)
+            return
+
+        # Applications of the overwritten RemoteConfig (if any) are removed from the index.
+        current_item = table.get_item(
+            Key={"remote_config_name": self.old_item["remote_config_name"]}
+        ).get("Item", {})
+        table.put_item(Item=self.old_item)
+
+        # Imported here because RemoteConfig module already imports this one.
+        # pylint: disable=import-outside-toplevel
+        from models.RemoteConfig import RemoteConfig
+
+        RemoteConfig.sync_applications(
+            self.old_item["remote_config_name"],
+            current_item.get("applications", []),
+            self.old_item["applications"],
+        )
 
     def to_dict(self) -> dict[str, Any]:
         """
@@ -6,6 +6,8 @@ from decimal import Decimal
 import os
 from typing import Any, List
 
+from boto3.dynamodb.conditions import Attr
+
 from FlaskApp import current_app
 from models.ABTest import ABTest
 from models.Audience import Audience
@@ -19,6 +21,8 @@ class RemoteConfig:
     This class represents a mobile application configuration that we can manage remotely.
     """
 
+    __abtest_assignments = ("random", "deterministic")
+
     def __init__(self, data: dict[str, Any]):
         self.__assert_data(data)
         self.__data = data
@@ -44,8 +48,15 @@ class RemoteConfig:
         """
         This static method returns all remote configs.
         """
-        response = RemoteConfig.__table_remote_configs(environment).scan()
-        return [RemoteConfig(item) for item in response["Items"]]
+        table = RemoteConfig.__table_remote_configs(environment)
+        response = table.scan()
+        items = response["Items"]
+
+        while "LastEvaluatedKey" in response:
+            response = table.scan(ExclusiveStartKey=response["LastEvaluatedKey"])
+            items.extend(response["Items"])
+
+        return [RemoteConfig(item) for item in items]
 
     @staticmethod
     def purge_from_audience(audience_name: str):
@@ -84,6 +95,83 @@ class RemoteConfig:
                     Key={"remote_config_name": remote_config.remote_config_name},
                     UpdateExpression="REMOVE overrides.#audience",
                 )
+                RemoteConfig.sync_applications(
+                    remote_config.remote_config_name,
+                    remote_config.application_IDs,
+                    remote_config.application_IDs,
+                    environment,
+                )
+
+    @staticmethod
+    def sync_applications(
+        remote_config_name: str,
+        old_application_IDs: list[str],
+        new_application_IDs: list[str],
+        environment: str = "",
+    ):
+        """
+        This static method updates remote-configs-applications table after <remote_config_name> changed.
+        For each application, this table stores its remote_config_names (read by key by
+        remote-configs Lambda) and a catalog_version (used by Lambda cache).
+        An application which is not indexed yet is entirely indexed.
+        """
+        table = RemoteConfig.__table_remote_configs_applications(environment)
+        for application_ID in set(old_application_IDs) | set(new_application_IDs):
+            response = table.get_item(
+                Key={"application_id": application_ID},
+                ProjectionExpression="is_indexed",
+            )
+            if not response.get("Item", {}).get("is_indexed"):
+                RemoteConfig.__index_application(application_ID, environment)
+                continue
+
+            operation = "ADD" if application_ID in new_application_IDs else "DELETE"
+            table.update_item(
+                Key={"application_id": application_ID},
+                UpdateExpression=f"{operation} remote_config_names :names ADD catalog_version :one",
+                ExpressionAttributeValues={":names": {remote_config_name}, ":one": 1},
+            )
+
+    @staticmethod
+    def index_all_applications(application_IDs: list[str], environment: str = ""):
+        """
+        This static method indexes <application_IDs> and every application of a remote
+        config in remote-configs-applications table, from a single scan of remote configs.
+        It is a one-off backfill of applications indexed before sync_applications existed.
+        """
+        table = RemoteConfig.__table_remote_configs(environment)
+        scan_kwargs = {
+            "ConsistentRead": True,
+            "ProjectionExpression": "remote_config_name, applications",
+        }
+        response = table.scan(**scan_kwargs)
+        items = response["Items"]
+
+        while "LastEvaluatedKey" in response:
+            response = table.scan(
+                ExclusiveStartKey=response["LastEvaluatedKey"], **scan_kwargs
+            )
+            items.extend(response["Items"])
+
+        remote_config_names: dict[str, set[str]] = {
+            application_ID: set() for application_ID in application_IDs
+        }
+        for item in items:
+            for application_ID in item.get("applications", []):
+                remote_config_names.setdefault(application_ID, set()).add(
+                    item["remote_config_name"]
+                )
+
+        for application_ID, names in sorted(remote_config_names.items()):
+            RemoteConfig.__save_index(application_ID, names, environment)
+            print(f"{application_ID} indexed with {len(names)} remote configs.")
+
+    @property
+    def abtest_assignment(self) -> str:
+        """
+        This method returns abtest_assignment ("random" or "deterministic").
+        """
+        return self.__data["abtest_assignment"]
 
     @property
     def application_IDs(self) -> list[str]:
@@ -145,6 +233,9 @@ class RemoteConfig:
 
         self.__purge_users_abtests(all_abtests=True)
         table.delete_item(Key={"remote_config_name": self.remote_config_name})
+        RemoteConfig.sync_applications(
+            self.remote_config_name, self.application_IDs, []
+        )
 
         history_item = HistoryItem(
             method="DELETE", old_item=self.__item, table_name=table.table_name
@@ -161,13 +252,22 @@ class RemoteConfig:
         """
         This method creates RemoteConfig in database.
         """
+        old_remote_config = RemoteConfig.from_database(self.remote_config_name)
         self.__purge_users_abtests()
         RemoteConfig.__table_remote_configs().put_item(Item=self.__item)
 
+        old_application_IDs = (
+            old_remote_config.application_IDs if old_remote_config else []
+        )
+        RemoteConfig.sync_applications(
+            self.remote_config_name, old_application_IDs, self.application_IDs
+        )
+
     @property
     def __item(self) -> dict[str, Any]:
         return {
             "remote_config_name": self.remote_config_name,
+            "abtest_assignment": self.abtest_assignment,
             "applications": self.application_IDs,
             "description": self.description,
             "new_users_threshold": self.new_users_threshold,
@@ -179,7 +279,9 @@ class RemoteConfig:
         }
 
     def __assert_data(self, data: dict[str, Any]):
+        data.setdefault("abtest_assignment", "random")
         to_assert = data.copy()
+        abtest_assignment = to_assert.pop("abtest_assignment")
         application_IDs = to_assert.pop("applications")
         description = to_assert.pop("description")
         new_users_threshold = to_assert.pop("new_users_threshold")
@@ -191,6 +293,9 @@ class RemoteConfig:
             new_users_threshold = int(new_users_threshold)
             data["new_users_threshold"] = new_users_threshold
 
+        assert (
+            abtest_assignment in self.__abtest_assignments
+        ), f"`abtest_assignment` should be in : {self.__abtest_assignments}"
         assert isinstance(
             application_IDs, list
         ), "`applications` should be a list of non-empty string"
@@ -217,6 +322,47 @@ class RemoteConfig:
 
         assert len(to_assert) == 0, f"Unexpected fields -> {to_assert.keys()}"
 
+    @staticmethod
+    def __index_application(application_ID: str, environment: str = ""):
+        table = RemoteConfig.__table_remote_configs(environment)
+        scan_kwargs = {
+            "ConsistentRead": True,
+            "FilterExpression": Attr("applications").contains(application_ID),
+            "ProjectionExpression": "remote_config_name",
+        }
+        response = table.scan(**scan_kwargs)
+        items = response["Items"]
+
+        while "LastEvaluatedKey" in response:
+            response = table.scan(
+                ExclusiveStartKey=response["LastEvaluatedKey"], **scan_kwargs
+            )
+            items.extend(response["Items"])
+
+        RemoteConfig.__save_index(
+            application_ID,
+            {item["remote_config_name"] for item in items},
+            environment,
+        )
+
+    @staticmethod
+    def __save_index(
+        application_ID: str, remote_config_names: set[str], environment: str = ""
+    ):
+        if remote_config_names:
+            # DynamoDB does not support empty sets
+            update_expression = "SET is_indexed = :true, remote_config_names = :names"
+            expression_attribute_values = {":true": True, ":names": remote_config_names}
+        else:
+            update_expression = "SET is_indexed = :true REMOVE remote_config_names"
+            expression_attribute_values = {":true": True}
+
+        RemoteConfig.__table_remote_configs_applications(environment).update_item(
+            Key={"application_id": application_ID},
+            UpdateExpression=f"{update_expression} ADD catalog_version :one",
+            ExpressionAttributeValues=expression_attribute_values | {":one": 1},
+        )
+
     def __purge_users_abtests(self, all_abtests: bool = False):
         """
         `all_abtests` should be True if the remote config will be entierly deleted.
@@ -250,3 +396,20 @@ class RemoteConfig:
                     constants.TABLE_REMOTE_CONFIGS_SANDBOX
                 )
         return current_app.database.Table(constants.TABLE_REMOTE_CONFIGS)
+
+    @staticmethod
+    def __table_remote_configs_applications(environment: str = ""):
+        match environment:
+            case "prod":
+                return current_app.prod_database.Table(
+                    constants.TABLE_REMOTE_CONFIGS_APPLICATIONS_PROD
+                )
+            case "dev":
+                return current_app.dev_database.Table(
+                    constants.TABLE_REMOTE_CONFIGS_APPLICATIONS_DEV
+                )
+            case "sandbox":
+                return current_app.sandbox_database.Table(
+                    constants.TABLE_REMOTE_CONFIGS_APPLICATIONS_SANDBOX
+                )
+        return current_app.database.Table(constants.TABLE_REMOTE_CONFIGS_APPLICATIONS)
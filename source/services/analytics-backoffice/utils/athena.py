@@ -0,0 +1,323 @@
+"""
+This module contains Athena helpers.
+The same module is used by every Lambda querying Athena : keep copies in sync.
+"""
+
+import csv
+from datetime import date, datetime, timedelta, timezone
+import hashlib
+import io
+import re
+from time import monotonic, sleep
+from typing import Any, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from mypy_boto3_athena import AthenaClient
+    from mypy_boto3_s3 import S3Client
+
+
+BATCH_GET_QUERY_EXECUTION_LIMIT = 50
+POLLING_INTERVAL_SECONDS = (0.2, 5.0)  # (first, max) : doubled while nothing changes
+
+RESULTS_CACHE_SIZE = 256
+# Partitions are written by Firehose with some buffering : a day is complete a bit later.
+PARTITION_COMPLETE_DELAY = timedelta(hours=1)
+COMPLETE_PARTITIONS_MAX_AGE_MINUTES = 24 * 60
+
+__TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|\s+|[^'\"\s-]+|-")
+__PARTITION = re.compile(
+    r"year\s*=\s*'(\d{4})'\s+AND\s+month\s*=\s*'(\d{1,2})'\s+AND\s+day\s*=\s*'(\d{1,2})'",
+    re.IGNORECASE,
+)
+
+# Container cache : key -> (expires_at, QueryExecution) of succeeded queries.
+__results: dict[str, tuple[float, dict[str, Any]]] = {}
+# QueryExecutionId -> (cache key, max age) of started queries whose results are cached.
+__reusable: dict[str, tuple[str, int]] = {}
+__statistics = {"lookups": 0, "hits": 0, "reused": 0, "saved_bytes": 0}
+
+
+def run_queries(
+    athena: "AthenaClient",
+    queries: dict[str, str],
+    database: str,
+    output_location: str,
+    max_age_minutes: int = 0,
+) -> dict[str, dict[str, Any]]:
+    """
+    This function runs <queries> (name -> query string) concurrently and returns their
+    QueryExecution (name -> get_query_execution()["QueryExecution"]) once all are done.
+    See start_queries() and wait_queries().
+    """
+    return wait_queries(
+        athena,
+        start_queries(athena, queries, database, output_location, max_age_minutes),
+    )
+
+
+def start_queries(
+    athena: "AthenaClient",
+    queries: dict[str, str],
+    database: str,
+    output_location: str,
+    max_age_minutes: int = 0,
+) -> dict[str, str]:
+    """
+    This function starts <queries> (name -> query string) and returns their query IDs
+    (name -> QueryExecutionId) : they can be waited by another invocation.
+    With <max_age_minutes>, results of the same query (same normalized text, hence
+    same partitions) are reused up to this age : from the container cache without
+    any Athena call, else by Athena result reuse without scanning S3 again.
+    Queries touching only complete partitions are reused up to a day.
+    """
+    query_IDs: dict[str, str] = {}
+    for name, query in queries.items():
+        reuse: dict[str, Any] = {}
+        if query_max_age_minutes := __max_age_minutes(query, max_age_minutes):
+            key = __key(database, query)
+            if cached := __cached(key):
+                query_IDs[name] = cached["QueryExecutionId"]
+                continue
+            reuse = {
+                "ResultReuseConfiguration": {
+                    "ResultReuseByAgeConfiguration": {
+                        "Enabled": True,
+                        "MaxAgeInMinutes": query_max_age_minutes,
+                    }
+                }
+            }
+
+        query_IDs[name] = athena.start_query_execution(
+            QueryString=query,
+            QueryExecutionContext={"Database": database},
+            ResultConfiguration={"OutputLocation": output_location},
+            **reuse,
+        )["QueryExecutionId"]
+        if reuse:
+            __reusable[query_IDs[name]] = (key, query_max_age_minutes)
+    return query_IDs
+
+
+def wait_queries(
+    athena: "AthenaClient",
+    query_IDs: dict[str, str],
+    timeout_seconds: float | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    This function waits queries of <query_IDs> (name -> QueryExecutionId) and returns
+    their QueryExecution (name -> get_query_execution()["QueryExecution"]).
+    All queries are polled together with BatchGetQueryExecution : total time is the
+    slowest query, not the sum of queries. After <timeout_seconds>, queries still
+    running are missing from the result.
+    """
+    # Only results still valid : start_queries() returns IDs of cached results.
+    now = monotonic()
+    cached = {
+        query_execution["QueryExecutionId"]: query_execution
+        for expires_at, query_execution in __results.values()
+        if expires_at > now
+    }
+    query_executions = {
+        name: cached[query_ID]
+        for name, query_ID in query_IDs.items()
+        if query_ID in cached
+    }
+    names = {
+        query_ID: name for name, query_ID in query_IDs.items() if query_ID not in cached
+    }
+    print(f"Waiting {len(names)} Athena queries...")
+
+    running = list(names)
+    interval = POLLING_INTERVAL_SECONDS[0]
+    start = monotonic()
+    while running:
+        if timeout_seconds is not None and monotonic() - start >= timeout_seconds:
+            print(f"{len(running)} Athena queries still running")
+            break
+        sleep(interval)
+        done = []
+        for i in range(0, len(running), BATCH_GET_QUERY_EXECUTION_LIMIT):
+            response = athena.batch_get_query_execution(
+                QueryExecutionIds=running[i : i + BATCH_GET_QUERY_EXECUTION_LIMIT]
+            )
+            for query_execution in response["QueryExecutions"]:
+                if query_execution["Status"]["State"] in ("QUEUED", "RUNNING"):
+                    continue
+                query_ID = query_execution["QueryExecutionId"]
+                done.append(query_ID)
+                query_executions[names[query_ID]] = query_execution
+                __report(names[query_ID], query_execution)
+                if query_ID in __reusable and succeeded(query_execution):
+                    __cache(*__reusable.pop(query_ID), query_execution)
+
+        running = [query_ID for query_ID in running if query_ID not in done]
+        # Back to a short interval as soon as a query ends : others often end close.
+        interval = (
+            POLLING_INTERVAL_SECONDS[0]
+            if done
+            else min(interval * 2, POLLING_INTERVAL_SECONDS[1])
+        )
+
+    scanned_bytes = sum(
+        __scanned_bytes(query_executions[name])
+        for query_ID, name in names.items()
+        if query_ID not in running
+    )
+    print(
+        f"{len(names) - len(running)} Athena queries done in"
+        f" {monotonic() - start:.1f} s : {scanned_bytes} bytes scanned"
+    )
+    if __statistics["lookups"]:
+        print(
+            f"Athena results : {__statistics['hits']}/{__statistics['lookups']} container"
+            f" cache hits, {__statistics['reused']} reused by Athena,"
+            f" {__statistics['saved_bytes']} bytes not scanned again"
+        )
+    return query_executions
+
+
+def normalize(query: str) -> str:
+    """
+    This function returns <query> without comments and with whitespaces collapsed.
+    String literals and quoted identifiers are kept as is.
+    """
+    tokens = []
+    for token in __TOKENS.findall(query):
+        if token.startswith("--"):
+            continue
+        if token.isspace():
+            if tokens and tokens[-1] != " ":
+                tokens.append(" ")
+            continue
+        tokens.append(token)
+    return "".join(tokens).strip().rstrip(";").strip()
+
+
+def partition_predicate(start_date: date, end_date: date) -> str:
+    """
+    This function returns a predicate on year/month/day partitions of raw_events which
+    selects exactly days from <start_date> to <end_date> (both included).
+    Each day is an explicit partition tuple (partitions values are zero-padded) :
+    Athena prunes all other partitions, whatever month or year boundaries.
+    """
+    return " OR ".join(
+        f"(year = '{day.year}' AND month = '{day.month:02}' AND day = '{day.day:02}')"
+        for day in (
+            start_date + timedelta(days=i)
+            for i in range((end_date - start_date).days + 1)
+        )
+    )
+
+
+def partitions(query: str) -> list[date]:
+    """
+    This function returns days of explicit year/month/day partitions in <query>.
+    An empty list means touched partitions are unknown (relative dates, full scan...).
+    """
+    return sorted(
+        date(int(year), int(month), int(day))
+        for year, month, day in __PARTITION.findall(query)
+    )
+
+
+def succeeded(query_execution: dict[str, Any]) -> bool:
+    """
+    This function returns True if <query_execution> succeeded.
+    """
+    return query_execution["Status"]["State"] == "SUCCEEDED"
+
+
+def query_rows(
+    s3: "S3Client",
+    query_execution: dict[str, Any],
+    columns: list[str] | None = None,
+) -> Iterator[list[str]]:
+    """
+    This function yields rows of succeeded <query_execution> results (header excluded),
+    with all columns or only <columns> (in this order).
+    The CSV result object is streamed from the query output location and parsed
+    incrementally : unlike get_query_results (pages of 1000 rows), memory does not
+    depend on the number of rows. NULL values are read as empty strings.
+    """
+    output_location = query_execution["ResultConfiguration"]["OutputLocation"]
+    bucket, _, key = output_location.removeprefix("s3://").partition("/")
+
+    body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+    with io.TextIOWrapper(body, encoding="utf-8", newline="") as file:
+        rows = csv.reader(file)
+        header = next(rows, None)
+        if header is None:
+            return
+        if columns is None:
+            yield from rows
+            return
+
+        indexes = [header.index(column) for column in columns]
+        for row in rows:
+            yield [row[index] for index in indexes]
+
+
+def __max_age_minutes(query: str, max_age_minutes: int) -> int:
+    if not max_age_minutes:
+        return 0
+    days = partitions(query)
+    if days and datetime.combine(
+        days[-1] + timedelta(days=1), datetime.min.time(), timezone.utc
+    ) + PARTITION_COMPLETE_DELAY <= datetime.now(timezone.utc):
+        return max(max_age_minutes, COMPLETE_PARTITIONS_MAX_AGE_MINUTES)
+    return max_age_minutes
+
+
+def __key(database: str, query: str) -> str:
+    normalized = normalize(query)
+    days = ",".join(day.isoformat() for day in partitions(normalized))
+    return hashlib.sha256(f"{database}\n{days}\n{normalized}".encode()).hexdigest()
+
+
+def __cached(key: str) -> dict[str, Any] | None:
+    __statistics["lookups"] += 1
+    expires_at, query_execution = __results.get(key, (0.0, None))
+    if query_execution is None or expires_at <= monotonic():
+        return None
+    __statistics["hits"] += 1
+    __statistics["saved_bytes"] += __scanned_bytes(query_execution)
+    print(f"Athena query {query_execution['QueryExecutionId']} results reused")
+    return query_execution
+
+
+def __cache(key: str, max_age_minutes: int, query_execution: dict[str, Any]):
+    statistics = query_execution.get("Statistics", {})
+    if statistics.get("ResultReuseInformation", {}).get("ReusedPreviousResult"):
+        __statistics["reused"] += 1
+        # Athena does not tell bytes of the reused query : known if it ran here before.
+        previous = __results.get(key, (0.0, {}))[1]
+        __statistics["saved_bytes"] += __scanned_bytes(previous)
+        query_execution = {
+            **query_execution,
+            "Statistics": {
+                **statistics,
+                "DataScannedInBytes": __scanned_bytes(previous),
+            },
+        }
+
+    __results.pop(key, None)
+    __results[key] = (monotonic() + max_age_minutes * 60, query_execution)
+    while len(__results) > RESULTS_CACHE_SIZE:
+        del __results[next(iter(__results))]
+
+
+def __scanned_bytes(query_execution: dict[str, Any]) -> int:
+    return query_execution.get("Statistics", {}).get("DataScannedInBytes", 0)
+
+
+def __report(name: str, query_execution: dict[str, Any]):
+    status = query_execution["Status"]
+    statistics = query_execution.get("Statistics", {})
+    print(
+        f"{name} query {query_execution['QueryExecutionId']} {status['State']} :"
+        f" queued {statistics.get('QueryQueueTimeInMillis', 0)} ms,"
+        f" ran {statistics.get('EngineExecutionTimeInMillis', 0)} ms,"
+        f" {statistics.get('DataScannedInBytes', 0)} bytes scanned"
+    )
+    if status["State"] != "SUCCEEDED":
+        print(f"ERROR with {name} query : {status.get('StateChangeReason')}")
@@ -16,20 +16,36 @@ __table_prefix_sandbox = f"{__project_name}-sandbox"
 ANALYTICS_BUCKET = f"{__table_prefix}-analyticsbucket"
 ANALYTICS_DATABASE = __table_prefix
 ANALYTICS_TABLE = "raw_events"
+# Latest events of the same day are shown again without a new scan up to this age.
+ATHENA_RESULTS_MAX_AGE_MINUTES = 5
 
 TABLE_ABTESTS = f"{__table_prefix}-abtests"
 TABLE_APPLICATIONS = f"{__table_prefix}-applications"
 TABLE_HISTORY = f"{__table_prefix}-history"
 TABLE_REMOTE_CONFIGS = f"{__table_prefix}-remote-configs"
+TABLE_REMOTE_CONFIGS_APPLICATIONS = f"{__table_prefix}-remote-configs-applications"
 TABLE_USERS_ABTESTS = f"{__table_prefix}-users-abtests"
 
 TABLE_AUDIENCES_PROD = f"{__table_prefix_prod}-audiences"
 TABLE_AUDIENCES_SANDBOX = f"{__table_prefix_sandbox}-audiences"
+# Item of audiences tables whose audiences_version is increased on every audience change
+# (read by remote-configs Lambda cache, keep in sync).
+AUDIENCES_VERSION_NAME = "__audiences_version__"
 
 TABLE_REMOTE_CONFIGS_PROD = f"{__table_prefix_prod}-remote-configs"
 TABLE_REMOTE_CONFIGS_DEV = f"{__table_prefix_dev}-remote-configs"
 TABLE_REMOTE_CONFIGS_SANDBOX = f"{__table_prefix_sandbox}-remote-configs"
 
+TABLE_REMOTE_CONFIGS_APPLICATIONS_PROD = (
+    f"{__table_prefix_prod}-remote-configs-applications"
+)
+TABLE_REMOTE_CONFIGS_APPLICATIONS_DEV = (
+    f"{__table_prefix_dev}-remote-configs-applications"
+)
+TABLE_REMOTE_CONFIGS_APPLICATIONS_SANDBOX = (
+    f"{__table_prefix_sandbox}-remote-configs-applications"
+)
+
 TABLE_HISTORY_PROD = f"{__table_prefix_prod}-history"
 TABLE_HISTORY_DEV = f"{__table_prefix_dev}-history"
 TABLE_HISTORY_SANDBOX = f"{__table_prefix_sandbox}-history"
@@ -0,0 +1,31 @@
+"""
+Benchmarks of remote-configs Lambda against an in-memory DynamoDB stand-in.
+Run them from remote-configs directory, e.g. `python -m benchmarks.bench_fanout`.
+"""
+
+import os
+
+
+# Lambda environment, required before importing Lambda modules.
+for variable, value in {
+    "ABTESTS_AUDIT_LOG": "false",
+    "AUDIENCES_TABLE_PROD": "bench-prod-audiences",
+    "AUDIENCES_TABLE_DEV": "bench-dev-audiences",
+    "AUDIENCES_TABLE_SANDBOX": "bench-sandbox-audiences",
+    "AWS_ACCESS_KEY_ID": "bench",  # Lambda credentials, no request reaches AWS
+    "AWS_DEFAULT_REGION": "eu-west-2",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_SESSION_TOKEN": "bench",
+    "CACHE_TIMEOUT_SECONDS": "60",
+    "DEV_REGION": "eu-west-3",
+    "GEODE_ENVIRONMENT": "sandbox",
+    "PROD_REGION": "eu-west-1",
+    "REMOTE_CONFIGS_TABLE": "bench-remote-configs",
+    "REMOTE_CONFIGS_APPLICATIONS_TABLE": "bench-remote-configs-applications",
+    "SANDBOX_REGION": "eu-west-2",
+    "USERS_ABTESTS_TABLE": "bench-users-abtests",
+    "USERS_AUDIENCES_TABLE": "bench-users-audiences",
+    "USERS_AUDIENCES_SNAPSHOT_BUCKET": "bench-analyticsbucket",
+    "USERS_AUDIENCES_SNAPSHOT_KEY": "",  # Memberships are read from the stand-in
+}.items():
+    os.environ.setdefault(variable, value)
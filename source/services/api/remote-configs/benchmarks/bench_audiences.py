@@ -0,0 +1,69 @@
+"""
+This benchmark compares property_based audiences evaluation of a payload, against
+every condition (before) or against candidates of AudienceIndex (after), as the
+number of audiences grows.
+
+Usage : python -m benchmarks.bench_audiences [--payloads 2000]
+"""
+
+import argparse
+import random
+from time import perf_counter
+
+from benchmarks.catalog import user_event
+from models.AudienceCondition import AudienceCondition
+from models.AudienceIndex import AudienceIndex
+
+
+COUNTRIES = ["FR", "DE", "US", "JP", "BR", "CN", "GB", "ES", "IT", "KR"]
+
+
+def conditions(count: int, rng: random.Random) -> list[tuple[str, AudienceCondition]]:
+    """
+    This function returns <count> realistic property_based audiences conditions.
+    """
+    templates = [
+        lambda i: f"country == '{rng.choice(COUNTRIES)}'",
+        lambda i: f"country in {rng.sample(COUNTRIES, 3)}",
+        lambda i: f"Version(app_version) >= Version('1.{i % 10}.{i % 7}')",
+        lambda i: f"Version('0.{i % 10}') <= Version(app_version) < Version('1.{i % 10}')",
+        lambda i: f"country == '{rng.choice(COUNTRIES)}' and Version(app_version) < Version('2.{i % 10}.0')",
+    ]
+    return [
+        (f"PROPERTY_{i}", AudienceCondition(rng.choice(templates)(i)))
+        for i in range(count)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payloads", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    payloads = [
+        user_event(user)["payload"]
+        | {"country": rng.choice(COUNTRIES), "app_version": f"{user % 3}.{user % 10}.0"}
+        for user in range(args.payloads)
+    ]
+
+    for count in (10, 100, 1000):
+        audiences = conditions(count, rng)
+        index = AudienceIndex(audiences)
+
+        start = perf_counter()
+        expected = [
+            [name for name, condition in audiences if condition.matches(payload)]
+            for payload in payloads
+        ]
+        linear = (perf_counter() - start) / len(payloads) * 1e6
+
+        start = perf_counter()
+        results = [index.matching(payload) for payload in payloads]
+        indexed = (perf_counter() - start) / len(payloads) * 1e6
+
+        assert results == expected
+        print(
+            f"{count:>5} audiences  linear={linear:8.1f} us  indexed={indexed:8.1f} us"
+            f"  matches/payload={sum(map(len, results)) / len(payloads):.1f}"
+        )
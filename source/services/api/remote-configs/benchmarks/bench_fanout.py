@@ -0,0 +1,82 @@
+"""
+This benchmark compares handler latency when its independent DynamoDB reads are
+issued sequentially (one request in flight) or concurrently (async clients).
+Caches are invalidated before each call so that every read really happens.
+
+Usage : python -m benchmarks.bench_fanout [--iterations 100]
+"""
+
+import argparse
+import asyncio
+from contextlib import redirect_stdout
+import io
+from statistics import quantiles
+from time import perf_counter
+
+from benchmarks.catalog import (
+    CatalogSizes,
+    create_stand_ins,
+    seed_catalog,
+    user_event,
+)
+from benchmarks.fake_dynamodb import FakeDynamoDB
+import main
+from models.Audience import Audience
+from models.RemoteConfigCatalog import RemoteConfigCatalog
+
+
+def run(
+    iterations: int, local: FakeDynamoDB, audiences: FakeDynamoDB, in_flight: int | None
+) -> list[float]:
+    """
+    This function returns handler latencies (ms) with at most <in_flight> DynamoDB
+    requests in flight across stand-ins (their own connection pools if None).
+    """
+    if in_flight is None:
+        local.in_flight, audiences.in_flight = asyncio.Semaphore(10), asyncio.Semaphore(
+            10
+        )
+    else:
+        local.in_flight = audiences.in_flight = asyncio.Semaphore(in_flight)
+
+    latencies = []
+    for i in range(iterations):
+        RemoteConfigCatalog.cache.invalidate()
+        Audience.cache.invalidate()
+        with redirect_stdout(io.StringIO()):
+            start = perf_counter()
+            main.handler(user_event(i), {})
+            latencies.append((perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: list[float]):
+    """
+    This function prints p50/p99 of <latencies>.
+    """
+    percentiles = quantiles(latencies, n=100)
+    print(f"{name:<12} p50={percentiles[49]:7.2f} ms  p99={percentiles[98]:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--local-latency-ms", type=float, default=5)
+    parser.add_argument("--cross-region-latency-ms", type=float, default=30)
+    args = parser.parse_args()
+
+    local, audiences = create_stand_ins(
+        args.local_latency_ms / 1000, args.cross_region_latency_ms / 1000
+    )
+    seed_catalog(local, audiences, CatalogSizes(remote_configs=50, audiences=20))
+
+    async def dynamodb_client(region_name: str | None = None) -> FakeDynamoDB:
+        """
+        This function replaces main.dynamodb_client with stand-ins.
+        """
+        return audiences if region_name == main.AUDIENCES_REGION else local
+
+    main.dynamodb_client = dynamodb_client
+
+    report("sequential", run(args.iterations, local, audiences, in_flight=1))
+    report("concurrent", run(args.iterations, local, audiences, in_flight=None))
@@ -0,0 +1,212 @@
+"""
+This benchmark drives handler against synthetic catalogs (10/100/1000 RemoteConfigs)
+with realistic payloads, with warm container caches and with cold ones.
+For each scenario, it reports p50/p95/p99 latency, DynamoDB calls, peak memory
+allocated per request and memory retained by the cached catalog. Results are written to a JSON file to compare revisions.
+
+Usage : python -m benchmarks.bench_handler [--iterations 200] [--output results.json]
+                                            [--baseline previous_results.json]
+Results go to benchmarks/results.json by default (benchmarks are not deployed).
+"""
+
+import argparse
+from contextlib import redirect_stdout
+import io
+import json
+import os
+import platform
+import subprocess
+from statistics import quantiles
+from time import perf_counter
+import tracemalloc
+from typing import Any
+
+import benchmarks
+from benchmarks.catalog import (
+    APPLICATION_ID,
+    CatalogSizes,
+    create_stand_ins,
+    seed_catalog,
+    user_event,
+)
+from benchmarks.fake_dynamodb import FakeDynamoDB
+import main
+from models.Audience import Audience
+from models.RemoteConfigCatalog import RemoteConfigCatalog
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """
+    This function returns p50/p95/p99 of <values>.
+    """
+    cuts = quantiles(values, n=100)
+    return {
+        "p50": round(cuts[49], 3),
+        "p95": round(cuts[94], 3),
+        "p99": round(cuts[98], 3),
+    }
+
+
+def run_scenario(
+    remote_configs_count: int, cache: str, args: argparse.Namespace
+) -> dict[str, Any]:
+    """
+    This function runs handler <args.iterations> times on a new catalog of
+    <remote_configs_count> RemoteConfigs and returns the scenario results.
+    """
+    local, audiences = create_stand_ins(
+        args.local_latency_ms / 1000, args.cross_region_latency_ms / 1000
+    )
+    seed_catalog(
+        local,
+        audiences,
+        CatalogSizes(
+            remote_configs=remote_configs_count,
+            audiences=args.audiences,
+            abtest_ratio=args.abtest_ratio,
+            users=args.iterations,
+        ),
+    )
+
+    async def dynamodb_client(region_name: str | None = None) -> FakeDynamoDB:
+        return audiences if region_name == main.AUDIENCES_REGION else local
+
+    main.dynamodb_client = dynamodb_client
+    RemoteConfigCatalog.cache.invalidate()
+    Audience.cache.invalidate()
+
+    def call(user: int):
+        if cache == "cold":
+            RemoteConfigCatalog.cache.invalidate()
+            Audience.cache.invalidate()
+        with redirect_stdout(io.StringIO()):
+            main.handler(user_event(user), {})
+
+    # Warm-up request (loads caches), then timed requests.
+    call(0)
+    local.reset_calls()
+    audiences.reset_calls()
+    latencies = []
+    for user in range(args.iterations):
+        start = perf_counter()
+        call(user)
+        latencies.append((perf_counter() - start) * 1000)
+    calls = local.calls + audiences.calls
+
+    # Allocations are measured on a second pass : tracing slows requests down.
+    peaks = []
+    tracemalloc.start()
+    for user in range(args.iterations):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        call(user)
+        peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+
+    # Memory retained by the catalog kept in container cache across invocations.
+    RemoteConfigCatalog.cache.invalidate()
+    baseline, _ = tracemalloc.get_traced_memory()
+    catalog = main.loop.run_until_complete(
+        RemoteConfigCatalog.from_cache(local, APPLICATION_ID)
+    )
+    catalog_kib = (tracemalloc.get_traced_memory()[0] - baseline) / 1024
+    tracemalloc.stop()
+    del catalog
+
+    return {
+        "remote_configs": remote_configs_count,
+        "cache": cache,
+        "latency_ms": percentiles(latencies),
+        "dynamodb_calls_per_request": {
+            operation: round(count / args.iterations, 3)
+            for operation, count in sorted(calls.items())
+        },
+        "peak_allocated_kib": percentiles(peaks),
+        "catalog_retained_kib": round(catalog_kib, 1),
+    }
+
+
+def revision() -> str | None:
+    """
+    This function returns the current git revision, if any.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results: dict[str, Any], baseline: dict[str, Any] | None):
+    """
+    This function prints <results>, with p50 and p99 changes against <baseline>.
+    """
+    baseline_scenarios = {
+        (scenario["remote_configs"], scenario["cache"]): scenario
+        for scenario in (baseline or {}).get("scenarios", [])
+    }
+    for scenario in results["scenarios"]:
+        latency = scenario["latency_ms"]
+        line = (
+            f"{scenario['remote_configs']:>5} configs {scenario['cache']:<5}"
+            f" p50={latency['p50']:8.2f} p95={latency['p95']:8.2f}"
+            f" p99={latency['p99']:8.2f} ms"
+            f"  alloc p50={scenario['peak_allocated_kib']['p50']:8.1f} KiB"
+            f"  catalog={scenario['catalog_retained_kib']:8.1f} KiB"
+            f"  calls={sum(scenario['dynamodb_calls_per_request'].values()):.2f}"
+        )
+        if previous := baseline_scenarios.get(
+            (scenario["remote_configs"], scenario["cache"])
+        ):
+            changes = [
+                f"{name} {(latency[name] / previous['latency_ms'][name] - 1) * 100:+.1f}%"
+                for name in ("p50", "p99")
+            ]
+            if "catalog_retained_kib" in previous:
+                changes.append(
+                    "catalog "
+                    f"{(scenario['catalog_retained_kib'] / previous['catalog_retained_kib'] - 1) * 100:+.1f}%"
+                )
+            line += f"  vs {baseline.get('revision')}: {', '.join(changes)}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument(
+        "--remote-configs", type=int, nargs="+", default=[10, 100, 1000]
+    )
+    parser.add_argument("--audiences", type=int, default=20)
+    parser.add_argument("--abtest-ratio", type=float, default=0.1)
+    parser.add_argument("--local-latency-ms", type=float, default=0)
+    parser.add_argument("--cross-region-latency-ms", type=float, default=0)
+    parser.add_argument(
+        "--output",
+        default=os.path.join(os.path.dirname(benchmarks.__file__), "results.json"),
+    )
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    results = {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "parameters": vars(args),
+        "scenarios": [
+            run_scenario(remote_configs_count, cache, args)
+            for remote_configs_count in args.remote_configs
+            for cache in ("warm", "cold")
+        ],
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=4)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    report(results, baseline)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,94 @@
+"""
+This benchmark measures remote-configs Lambda cold start in fresh interpreters :
+import time per module (python -X importtime) and initialization time of the
+DynamoDB clients used by a first request.
+It exits with an error when median cold start (import + init) exceeds the budget.
+
+Usage : python -m benchmarks.bench_startup [--runs 10] [--budget-ms 400]
+"""
+
+import argparse
+from collections import defaultdict
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+import benchmarks
+
+
+REMOTE_CONFIGS_DIRECTORY = os.path.dirname(os.path.dirname(benchmarks.__file__))
+
+# Executed by each fresh interpreter. No request is sent : clients are only created.
+COLD_START_SCRIPT = """
+import json
+from time import perf_counter
+
+start = perf_counter()
+import main
+imported = perf_counter()
+main.loop.run_until_complete(main.dynamodb_client())
+main.loop.run_until_complete(main.dynamodb_client(main.AUDIENCES_REGION))
+initialized = perf_counter()
+
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "init": (initialized - imported) * 1000,
+}))
+"""
+
+
+def cold_start() -> tuple[dict[str, float], dict[str, float]]:
+    """
+    This function runs one cold start and returns (phases, imports) durations (ms).
+    Lambda modules are reported one by one, third-party modules by package.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", COLD_START_SCRIPT],
+        capture_output=True,
+        check=True,
+        cwd=REMOTE_CONFIGS_DIRECTORY,
+        text=True,
+    )
+
+    imports: dict[str, float] = defaultdict(float)
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line.removeprefix("import time:").split("|")
+        module = module.strip()
+        package = module.split(".")[0]
+        name = module if package in ("main", "models", "utils") else package
+        imports[name] += int(self_us) / 1000
+
+    return json.loads(process.stdout.splitlines()[-1]), imports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=400)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [cold_start() for _ in range(args.runs)]
+    phases = {name: median(run[0][name] for run in runs) for name in runs[0][0]}
+    imports = {
+        name: median(run[1].get(name, 0) for run in runs)
+        for name in set().union(*(run[1] for run in runs))
+    }
+
+    print(f"Median over {args.runs} cold starts (ms)")
+    for name, duration in phases.items():
+        print(f"  {name:<12} {duration:8.2f}")
+    print("Slowest imports (self time, ms)")
+    for name, duration in sorted(imports.items(), key=lambda item: -item[1])[
+        : args.top
+    ]:
+        print(f"  {name:<40} {duration:8.2f}")
+
+    total = phases["import"] + phases["init"]
+    print(f"Cold start: {total:.2f} ms (budget: {args.budget_ms:.0f} ms)")
+    if total > args.budget_ms:
+        sys.exit(1)
@@ -0,0 +1,186 @@
+"""
+This module seeds DynamoDB stand-ins with a synthetic remote-configs catalog.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+import random
+from typing import Any
+
+from benchmarks.fake_dynamodb import FakeDynamoDB
+from utils import constants
+
+
+APPLICATION_ID = "android.com.geode.benchmark"
+
+
+def create_stand_ins(
+    local_latency_seconds: float, audiences_latency_seconds: float
+) -> tuple[FakeDynamoDB, FakeDynamoDB]:
+    """
+    This function returns (local, audiences) DynamoDB stand-ins with remote-configs tables.
+    Audiences tables live in another region, hence a higher latency.
+    """
+    local = FakeDynamoDB(local_latency_seconds)
+    local.create_table(constants.REMOTE_CONFIGS_TABLE, ("remote_config_name",))
+    local.create_table(constants.REMOTE_CONFIGS_APPLICATIONS_TABLE, ("application_id",))
+    local.create_table(constants.USERS_ABTESTS_TABLE, ("uid", "abtest_ID"))
+    local.create_table(
+        constants.USERS_AUDIENCES_TABLE,
+        ("uid", "audience_name"),
+        indexes={"uid-index": ("uid",)},
+    )
+
+    audiences = FakeDynamoDB(audiences_latency_seconds)
+    for table_name in (
+        constants.AUDIENCES_TABLE_PROD,
+        constants.AUDIENCES_TABLE_SANDBOX,
+    ):
+        audiences.create_table(
+            table_name, ("audience_name",), indexes={"type-index": ("type",)}
+        )
+
+    return local, audiences
+
+
+@dataclass(frozen=True)
+class CatalogSizes:
+    """
+    This class represents sizes of a synthetic catalog : <remote_configs> RemoteConfigs,
+    <audiences> audiences of each type (developer, property_based, event_based), a share
+    <abtest_ratio> of abtest overrides and <users> users with event_based memberships.
+    """
+
+    remote_configs: int
+    audiences: int
+    abtest_ratio: float = 0.1
+    users: int = 1000
+
+
+def seed_catalog(
+    local: FakeDynamoDB, audiences: FakeDynamoDB, sizes: CatalogSizes, seed: int = 0
+):
+    """
+    This function seeds stand-ins with a synthetic catalog of <sizes>.
+    """
+    rng = random.Random(seed)
+    __seed_audiences(audiences, sizes, rng)
+    __seed_memberships(local, sizes, rng)
+
+    audience_names = [
+        f"{audience_type}_{i}"
+        for i in range(sizes.audiences)
+        for audience_type in ("DEVELOPER", "PROPERTY", "EVENT")
+    ]
+    remote_configs = local.Table(constants.REMOTE_CONFIGS_TABLE)
+    for i in range(sizes.remote_configs):
+        item = {
+            "remote_config_name": f"remote_config_{i}",
+            "applications": [APPLICATION_ID],
+            "description": "",
+            "new_users_threshold": Decimal(0),
+            "overrides": {
+                audience_name: __override(i, sizes.abtest_ratio, rng)
+                for audience_name in rng.sample(
+                    audience_names, k=min(3, len(audience_names))
+                )
+            },
+            "reference_value": f"reference-{i}",
+        }
+        remote_configs.items[remote_configs.key_of(item)] = item
+
+    applications = local.Table(constants.REMOTE_CONFIGS_APPLICATIONS_TABLE)
+    item = {
+        "application_id": APPLICATION_ID,
+        "catalog_version": Decimal(1),
+        "is_indexed": True,
+        "remote_config_names": {
+            f"remote_config_{i}" for i in range(sizes.remote_configs)
+        },
+    }
+    applications.items[applications.key_of(item)] = item
+
+
+def user_event(user: int) -> dict[str, Any]:
+    """
+    This function returns a realistic Lambda event for user number <user>.
+    """
+    return {
+        "applicationId": APPLICATION_ID,
+        "country": "FR" if user % 2 else "US",
+        "payload": {
+            "app_version": f"1.{user % 10}.{user % 3}",
+            "device_id": f"device-{user}",
+            "start_first_session_date": 1700000000 + user,
+        },
+        "userId": f"user-{user}",
+    }
+
+
+def __seed_audiences(audiences: FakeDynamoDB, sizes: CatalogSizes, rng: random.Random):
+    """
+    This function seeds audiences tables with audiences of each type.
+    """
+    for table_name in (
+        constants.AUDIENCES_TABLE_PROD,
+        constants.AUDIENCES_TABLE_SANDBOX,
+    ):
+        table = audiences.Table(table_name)
+        for i in range(sizes.audiences):
+            developer_IDs = [f"device-{j}" for j in range(i * 5, i * 5 + 5)]
+            for item in (
+                {
+                    "audience_name": f"DEVELOPER_{i}",
+                    "condition": f"device_id in {developer_IDs}",
+                    "type": "developer",
+                },
+                {
+                    "audience_name": f"PROPERTY_{i}",
+                    "condition": rng.choice(
+                        [
+                            f"country == '{rng.choice(['FR', 'DE', 'US', 'JP'])}'",
+                            f"Version(app_version) >= Version('1.{i % 10}.0')",
+                            f"country == 'FR' and Version(app_version) < Version('2.{i % 10}.0')",
+                        ]
+                    ),
+                    "type": "property_based",
+                },
+                {
+                    "audience_name": f"EVENT_{i}",
+                    "condition": "event_name = 'level_completed'",
+                    "type": "event_based",
+                },
+            ):
+                table.items[table.key_of(item)] = item
+
+
+def __seed_memberships(local: FakeDynamoDB, sizes: CatalogSizes, rng: random.Random):
+    """
+    This function seeds users-audiences table : each user is in 3 event_based audiences.
+    """
+    users_audiences = local.Table(constants.USERS_AUDIENCES_TABLE)
+    for user in range(sizes.users):
+        for i in rng.sample(range(sizes.audiences), k=min(3, sizes.audiences)):
+            item = {"uid": f"user-{user}", "audience_name": f"EVENT_{i}"}
+            users_audiences.items[users_audiences.key_of(item)] = item
+
+
+def __override(i: int, abtest_ratio: float, rng: random.Random) -> dict[str, Any]:
+    """
+    This function returns an abtest override (with probability <abtest_ratio>), or a
+    fixed override of remote config number <i>.
+    """
+    if rng.random() < abtest_ratio:
+        return {
+            "active": Decimal(1),
+            "override_type": "abtest",
+            "abtest_value": {
+                "target_user_percent": Decimal(50),
+                "variants": ["variant_a", "variant_b"],
+            },
+        }
+    return {
+        "active": Decimal(rng.choice([0, 1])),
+        "override_type": "fixed",
+        "fixed_value": f"fixed-{i}",
+    }
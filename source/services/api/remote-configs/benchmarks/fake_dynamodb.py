@@ -0,0 +1,233 @@
+"""
+This module contains an in-memory stand-in of the async (aiobotocore) DynamoDB client.
+It only implements what remote-configs Lambda uses, with a simulated network latency.
+"""
+
+import asyncio
+from collections import Counter
+from copy import deepcopy
+from dataclasses import dataclass, field
+import re
+from typing import Any
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+
+SERIALIZER = TypeSerializer()
+DESERIALIZER = TypeDeserializer()
+# Expressions used by remote-configs Lambda : "name = :value", "contains(name, :value)".
+EQUALS = re.compile(r"^\s*(#?\w+)\s*=\s*(:\w+)\s*$")
+CONTAINS = re.compile(r"^\s*contains\(\s*(#?\w+)\s*,\s*(:\w+)\s*\)\s*$")
+
+
+class FakeDynamoDB:
+    """
+    This class represents an in-memory DynamoDB client (one region).
+    Every call sleeps `latency_seconds` to simulate a network round-trip, with at most
+    `in_flight` concurrent calls (aiobotocore default connection pool : 10).
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.in_flight = asyncio.Semaphore(10)
+        self.calls: Counter[str] = Counter()
+        self.__tables: dict[str, FakeTable] = {}
+
+    def create_table(
+        self,
+        table_name: str,
+        key_schema: tuple[str, ...],
+        indexes: dict[str, tuple[str, ...]] | None = None,
+    ) -> "FakeTable":
+        """
+        This method creates a table. <key_schema> is (hash_key,) or (hash_key, range_key).
+        """
+        table = FakeTable(table_name, key_schema, indexes or {})
+        self.__tables[table_name] = table
+        return table
+
+    async def record_call(self, operation: str):
+        """
+        This method counts <operation> and simulates its network latency.
+        """
+        self.calls[operation] += 1
+        async with self.in_flight:
+            if self.latency_seconds:
+                await asyncio.sleep(self.latency_seconds)
+
+    def reset_calls(self):
+        """
+        This method resets call counters.
+        """
+        self.calls.clear()
+
+    def Table(self, table_name: str) -> "FakeTable":  # pylint: disable=invalid-name
+        """
+        This method returns <table_name> table, to seed it.
+        """
+        return self.__tables[table_name]
+
+    async def batch_get_item(
+        self, *, RequestItems: dict[str, Any], **_
+    ) -> dict[str, Any]:
+        """
+        aiobotocore batch_get_item().
+        """
+        await self.record_call("BatchGetItem")
+        responses = {}
+        for table_name, request in RequestItems.items():
+            table = self.__tables[table_name]
+            responses[table_name] = [
+                serialize(item)
+                for key in request["Keys"]
+                if (item := table.items.get(table.key_of(deserialize(key))))
+            ]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    async def batch_write_item(
+        self, RequestItems: dict[str, Any], **_
+    ) -> dict[str, Any]:
+        """
+        aiobotocore batch_write_item().
+        """
+        await self.record_call("BatchWriteItem")
+        for table_name, requests in RequestItems.items():
+            table = self.__tables[table_name]
+            for request in requests:
+                if "PutRequest" in request:
+                    item = deserialize(request["PutRequest"]["Item"])
+                    table.items[table.key_of(item)] = item
+                else:
+                    key = deserialize(request["DeleteRequest"]["Key"])
+                    table.items.pop(table.key_of(key), None)
+        return {"UnprocessedItems": {}}
+
+    async def get_item(
+        self,
+        *,
+        TableName: str,
+        Key: dict[str, Any],
+        ProjectionExpression: str | None = None,
+        **_,
+    ) -> dict[str, Any]:
+        """
+        aiobotocore get_item().
+        """
+        await self.record_call("GetItem")
+        table = self.__tables[TableName]
+        if item := table.items.get(table.key_of(deserialize(Key))):
+            return {"Item": serialize(project(item, ProjectionExpression))}
+        return {}
+
+    async def query(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        TableName: str,
+        KeyConditionExpression: str,
+        ExpressionAttributeValues: dict[str, Any],
+        IndexName: str | None = None,
+        ExpressionAttributeNames: dict[str, str] | None = None,
+        ProjectionExpression: str | None = None,
+        **_,
+    ) -> dict[str, Any]:
+        """
+        aiobotocore query() of the table, or of its <IndexName> index. Like DynamoDB, the
+        key condition must be on the hash key of the queried key schema, and an index only
+        has items with all its key attributes. Pagination is not simulated.
+        """
+        await self.record_call("Query")
+        table = self.__tables[TableName]
+        if IndexName is None:
+            key_schema = table.key_schema
+        elif IndexName in table.indexes:
+            key_schema = table.indexes[IndexName]
+        else:
+            raise ValueError(f"{TableName} has no {IndexName} index")
+
+        match = EQUALS.match(KeyConditionExpression)
+        if not match:
+            raise NotImplementedError(f"Key condition {KeyConditionExpression}")
+        name = (ExpressionAttributeNames or {}).get(match[1], match[1])
+        if name != key_schema[0]:
+            raise ValueError(
+                f"Key condition of {TableName} {IndexName or 'table'} query"
+                f" is not on {key_schema[0]}"
+            )
+        value = DESERIALIZER.deserialize(ExpressionAttributeValues[match[2]])
+        return {
+            "Items": [
+                serialize(project(item, ProjectionExpression))
+                for item in table.items.values()
+                if all(attribute in item for attribute in key_schema)
+                and item[name] == value
+            ]
+        }
+
+    async def scan(
+        self,
+        *,
+        TableName: str,
+        FilterExpression: str | None = None,
+        ExpressionAttributeValues: dict[str, Any] | None = None,
+        **_,
+    ) -> dict[str, Any]:
+        """
+        aiobotocore scan(). Pagination is not simulated.
+        """
+        await self.record_call("Scan")
+        if FilterExpression is None:
+            items = self.__tables[TableName].items.values()
+        elif match := CONTAINS.match(FilterExpression):
+            value = DESERIALIZER.deserialize(
+                (ExpressionAttributeValues or {})[match[2]]
+            )
+            items = [
+                item
+                for item in self.__tables[TableName].items.values()
+                if value in item.get(match[1], ())
+            ]
+        else:
+            raise NotImplementedError(f"Filter {FilterExpression}")
+        return {"Items": [serialize(item) for item in items]}
+
+
+@dataclass
+class FakeTable:
+    """
+    This class represents an in-memory DynamoDB table (items with Python values).
+    """
+
+    table_name: str
+    key_schema: tuple[str, ...]
+    indexes: dict[str, tuple[str, ...]]
+    items: dict[tuple, dict[str, Any]] = field(default_factory=dict)
+
+    def key_of(self, item: dict[str, Any]) -> tuple:
+        """
+        This method returns primary key of <item>.
+        """
+        return tuple(item[attribute] for attribute in self.key_schema)
+
+
+def project(item: dict[str, Any], projection: str | None) -> dict[str, Any]:
+    """
+    This function returns <projection> attributes of <item> (all if None).
+    """
+    if projection is None:
+        return item
+    names = [name.strip() for name in projection.split(",")]
+    return {name: item[name] for name in names if name in item}
+
+
+def serialize(item: dict[str, Any]) -> dict[str, Any]:
+    """
+    This function returns a copy of <item> with DynamoDB typed values.
+    """
+    return {name: SERIALIZER.serialize(deepcopy(value)) for name, value in item.items()}
+
+
+def deserialize(item: dict[str, Any]) -> dict[str, Any]:
+    """
+    This function returns <item> with Python values.
+    """
+    return {name: DESERIALIZER.deserialize(value) for name, value in item.items()}
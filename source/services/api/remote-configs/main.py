@@ -2,75 +2,222 @@
 Lambda handler
 """
 
+import asyncio
+import json
 import os
 import sys
-from typing import Any
-
-import boto3
+from typing import Any, TYPE_CHECKING
 
 from models.ABTest import ABTest
 from models.Audience import Audience
 from models.RemoteConfig import RemoteConfig
+from models.RemoteConfigCatalog import RemoteConfigCatalog
 from models.UserABTest import UserABTest
+from utils import constants, tracing
+from utils.dynamodb import dynamodb_client
+
+if TYPE_CHECKING:
+    from types_aiobotocore_dynamodb.client import DynamoDBClient
 
 
-dynamodb = boto3.resource("dynamodb")
-prod_dynamodb = boto3.resource("dynamodb", region_name=os.environ["PROD_REGION"])
-dev_dynamodb = boto3.resource("dynamodb", region_name=os.environ["DEV_REGION"])
-sandbox_dynamodb = boto3.resource("dynamodb", region_name=os.environ["SANDBOX_REGION"])
+# Audiences tables are shared : dev uses prod audiences.
+AUDIENCES_REGION = (
+    os.environ["PROD_REGION"]
+    if os.environ["GEODE_ENVIRONMENT"] in ("dev", "prod")
+    else os.environ["SANDBOX_REGION"]
+)
 
-audience_dynamodb = sandbox_dynamodb
-if os.environ["GEODE_ENVIRONMENT"] in ("dev", "prod"):
-    audience_dynamodb = prod_dynamodb
+# Event loop of the container : async DynamoDB and S3 clients (and their connection
+# pools) are bound to it and reused by every invocation.
+loop = asyncio.new_event_loop()
 
 
+@tracing.traced_handler
 def handler(event: dict[str, Any], context: dict[str, Any]):
     """
     lambda handler
+    It runs async_handler on the event loop of the container.
     """
+    return loop.run_until_complete(async_handler(event, context))
+
+
+async def async_handler(event: dict[str, Any], context: dict[str, Any]):
+    """
+    async lambda handler, for single user and bulk ("users") events.
+    """
+    if "users" in event:
+        # Direct invocation only : bulk resolution for many users.
+        return await batch_handler(event, context)
+
     print("Attempting to retrieve remote configs.")
     print(f"Event: {event}")
     print(f"Context: {context}")
 
-    result = {}
-    application_ID = event["applicationId"]
+    if event.get("invalidateCache"):
+        # Direct invocation only : forces this container to reload its cached data.
+        # Other containers reload catalogs and audiences whose version changed
+        # once their cache timeout expired.
+        RemoteConfigCatalog.cache.invalidate()
+        Audience.cache.invalidate()
+        return {}
+
     user_ID = event["userId"]
     payload: dict[str, Any] = event["payload"] | {"country": event["country"]}
+    # Clients sending "fingerprint" (even empty) get {"fingerprint", "remote_configs"},
+    # or {"fingerprint", "not_modified"} when their last fingerprint is still valid.
+    client_fingerprint = payload.pop("fingerprint", None)
+    fingerprinted = "fingerprint" in event["payload"]
+
+    (
+        catalog,
+        results,
+        new_user_abtests,
+        deterministic_user_abtests,
+    ) = await __resolve_users(event["applicationId"], {user_ID: payload})
+    result = results[user_ID]
 
-    remote_configs = RemoteConfig.get_all(dynamodb, application_ID)
-    if not remote_configs:
+    if not fingerprinted:
+        await __save_abtests(new_user_abtests, deterministic_user_abtests)
         return result
 
-    # Audience Priority : "developer", "property_based", "event_based", "ALL"
-    user_audiences: list[Audience] = []
-    user_audiences.extend(Audience.developer_audiences(audience_dynamodb, payload))
-    user_audiences.extend(Audience.property_based_audiences(audience_dynamodb, payload))
-    user_audiences.extend(Audience.event_based_audiences(dynamodb, user_ID))
-    user_audience_names = [audience.audience_name for audience in user_audiences] + [
-        "ALL"
+    fingerprint = catalog.fingerprint(result)
+    if fingerprint == client_fingerprint and not new_user_abtests:
+        # Client already has these values and all its groups are persisted.
+        return {"fingerprint": fingerprint, "not_modified": True}
+
+    await __save_abtests(new_user_abtests, deterministic_user_abtests)
+    return {"fingerprint": fingerprint, "remote_configs": result}
+
+
+async def batch_handler(event: dict[str, Any], context: dict[str, Any]):
+    """
+    async lambda handler for bulk resolution (direct invocation), e.g. push campaigns :
+    {"applicationId": str, "users": [{"userId": str, "payload": dict, "country": str}]}
+    It returns remote configs of each user by userId.
+    Catalog and audiences definitions are loaded once, event_based memberships and
+    ABTests groups of all users are read (and written) with concurrent batched requests.
+    """
+    print(f"Attempting to retrieve remote configs of {len(event['users'])} users.")
+    print(f"Context: {context}")
+
+    _, results, new_user_abtests, deterministic_user_abtests = await __resolve_users(
+        event["applicationId"],
+        {
+            user["userId"]: user["payload"] | {"country": user["country"]}
+            for user in event["users"]
+        },
+    )
+    await __save_abtests(new_user_abtests, deterministic_user_abtests)
+
+    return results
+
+
+async def __resolve_users(
+    application_ID: str, payloads: dict[str, dict[str, Any]]
+) -> tuple[
+    RemoteConfigCatalog, dict[str, dict[str, Any]], list[UserABTest], list[UserABTest]
+]:
+    """
+    This function returns (catalog, results by user, new groups, deterministic groups)
+    for <payloads> of each user (one user, or many users of batch_handler).
+    Independent reads are awaited concurrently, so latency is the slowest read, not the
+    sum.
+    """
+    dynamodb = await dynamodb_client()
+    audiences_dynamodb = await dynamodb_client(AUDIENCES_REGION)
+
+    catalog_task = asyncio.create_task(
+        RemoteConfigCatalog.from_cache(dynamodb, application_ID)
+    )
+    audiences_tasks = [
+        asyncio.create_task(Audience.developer_audiences(audiences_dynamodb, payloads)),
+        asyncio.create_task(
+            Audience.property_based_audiences(audiences_dynamodb, payloads)
+        ),
     ]
+    try:
+        if len(payloads) == 1:
+            # One user : memberships are read by uid, without waiting for the catalog.
+            (user_ID,) = payloads
+            audiences_tasks.append(
+                asyncio.create_task(__event_based_audiences(dynamodb, user_ID))
+            )
+            catalog = await catalog_task
+        else:
+            # Many users : only memberships of audiences with an active override are read.
+            catalog = await catalog_task
+            audiences_tasks.append(
+                asyncio.create_task(
+                    Audience.event_based_audiences_of_users(
+                        dynamodb,
+                        audiences_dynamodb,
+                        list(payloads),
+                        catalog.audience_names,
+                    )
+                )
+            )
+        print(f"RemoteConfigs cache: {RemoteConfigCatalog.cache.stats()}")
+        if not catalog.remote_configs:
+            return catalog, {user_ID: {} for user_ID in payloads}, [], []
 
-    start_first_session_date = payload.get("start_first_session_date", 0)
+        developer_audiences, property_based_audiences, event_based_audiences = [
+            await task for task in audiences_tasks
+        ]
+    finally:
+        # Reads left (empty catalog, or an error) are cancelled and awaited : none of
+        # them goes on during the next invocation (nor into its EMF record).
+        for task in [catalog_task, *audiences_tasks]:
+            task.cancel()
+        await asyncio.gather(catalog_task, *audiences_tasks, return_exceptions=True)
+    print(f"Audiences cache: {Audience.cache.stats()}")
 
-    for remote_config in remote_configs:
-        if start_first_session_date < remote_config.new_users_threshold:
-            # The user is NOT considered a "New User" for this Remote Config
-            continue
+    results: dict[str, dict[str, Any]] = {}
+    users_remote_configs_abtests: dict[str, list[tuple[RemoteConfig, ABTest]]] = {}
+    for user_ID, payload in payloads.items():
+        # Audience Priority : "developer", "property_based", "event_based", "ALL"
+        user_audiences = (
+            developer_audiences[user_ID]
+            + property_based_audiences[user_ID]
+            + event_based_audiences[user_ID]
+        )
+        results[user_ID], users_remote_configs_abtests[user_ID] = __resolve(
+            catalog, user_audiences, payload
+        )
 
-        # First, we search if there is an active override that matches with user audiences.
-        user_audience = None
-        user_override = None
+    new_user_abtests, deterministic_user_abtests = await __resolve_abtests(
+        dynamodb, results, users_remote_configs_abtests
+    )
+    return catalog, results, new_user_abtests, deterministic_user_abtests
 
-        for audience_name in user_audience_names:
-            override = remote_config.overrides.get(audience_name)
-            if not override:
-                continue
 
-            if override.active:
-                user_audience = audience_name
-                user_override = override
-                break
+async def __event_based_audiences(
+    dynamodb: "DynamoDBClient", user_ID: str
+) -> dict[str, list[Audience]]:
+    """
+    This function returns event_based Audiences of <user_ID>, by user_ID.
+    """
+    return {user_ID: await Audience.event_based_audiences(dynamodb, user_ID)}
 
+
+def __resolve(
+    catalog: RemoteConfigCatalog,
+    user_audiences: list[Audience],
+    payload: dict[str, Any],
+) -> tuple[dict[str, Any], list[tuple[RemoteConfig, ABTest]]]:
+    """
+    This function returns the user result with reference and fixed values, and the
+    (RemoteConfig, ABTest) the user takes part in, which are not resolved yet.
+    <user_audiences> are sorted by priority ("ALL" is added last).
+    """
+    result = {}
+    remote_configs_abtests: list[tuple[RemoteConfig, ABTest]] = []
+    user_audience_names = [audience.audience_name for audience in user_audiences] + [
+        "ALL"
+    ]
+
+    for remote_config, user_audience, user_override in catalog.resolve(
+        user_audience_names, payload.get("start_first_session_date", 0)
+    ):
         if not user_audience or not user_override:
             # RemoteConfig has no Override or there is no audience that matches the user
             result[remote_config.remote_config_name] = {
@@ -79,28 +226,85 @@ def handler(event: dict[str, Any], context: dict[str, Any]):
             }
             continue
 
-        if user_override.override_type == "fixed":
+        if user_override.abtest is None:
+            # override_type == fixed
             result[remote_config.remote_config_name] = {
                 "value": user_override.fixed_value,
                 "value_origin": "reference_value",
             }
             continue
 
-        # override_type == abtest
-        abtest = ABTest(
-            remote_config.remote_config_name, user_audience, user_override.abtest_value
+        # override_type == abtest : resolved by __resolve_abtests with all other ABTests.
+        remote_configs_abtests.append((remote_config, user_override.abtest))
+
+    return result, remote_configs_abtests
+
+
+async def __resolve_abtests(
+    dynamodb: "DynamoDBClient",
+    results: dict[str, dict[str, Any]],
+    users_remote_configs_abtests: dict[str, list[tuple[RemoteConfig, ABTest]]],
+) -> tuple[list[UserABTest], list[UserABTest]]:
+    """
+    This function sets ABTests values into results of each user, and returns
+    (new groups, deterministic groups) to be saved by __save_abtests.
+    Deterministic ABTests need no I/O. Other ones are read with concurrent BatchGetItem.
+    """
+    persisted_keys = [
+        (user_ID, abtest)
+        for user_ID, remote_configs_abtests in users_remote_configs_abtests.items()
+        for remote_config, abtest in remote_configs_abtests
+        if remote_config.abtest_assignment != "deterministic"
+    ]
+    user_abtests = {
+        (user_ID, abtest.ID): user_abtest
+        for (user_ID, abtest), user_abtest in zip(
+            persisted_keys, await UserABTest.get_all(dynamodb, persisted_keys)
         )
-        user_abtest = UserABTest(dynamodb, user_ID, abtest)
+    }
+    new_user_abtests: list[UserABTest] = []
+    deterministic_user_abtests: list[UserABTest] = []
 
-        if not user_abtest.exists:
-            user_abtest.set_group(remote_config.reference_value)
+    for user_ID, remote_configs_abtests in users_remote_configs_abtests.items():
+        for remote_config, abtest in remote_configs_abtests:
+            if remote_config.abtest_assignment == "deterministic":
+                user_abtest = UserABTest(user_ID, abtest)
+                user_abtest.set_group(remote_config.reference_value, deterministic=True)
+                deterministic_user_abtests.append(user_abtest)
+            else:
+                user_abtest = user_abtests[(user_ID, abtest.ID)]
+                if not user_abtest.exists:
+                    user_abtest.set_group(remote_config.reference_value)
+                    new_user_abtests.append(user_abtest)
 
-        result[remote_config.remote_config_name] = {
-            "value": user_abtest.value,
-            "value_origin": "abtest" if user_abtest.is_in_test else "reference_value",
-        }
+            results[user_ID][remote_config.remote_config_name] = {
+                "value": user_abtest.value,
+                "value_origin": (
+                    "abtest" if user_abtest.is_in_test else "reference_value"
+                ),
+            }
+
+    return new_user_abtests, deterministic_user_abtests
+
+
+async def __save_abtests(
+    new_user_abtests: list[UserABTest], deterministic_user_abtests: list[UserABTest]
+):
+    """
+    This function persists new groups by concurrent batched writes. They are all
+    awaited : Lambda freezes the container once the handler returns, a pending write
+    would be lost.
+    Deterministic groups are only printed to the audit log (no database I/O).
+    """
+    if constants.ABTESTS_AUDIT_LOG and deterministic_user_abtests:
+        print(
+            "\n".join(
+                json.dumps({"abtest_audit": user_abtest.to_dict()})
+                for user_abtest in deterministic_user_abtests
+            )
+        )
 
-    return result
+    await UserABTest.save_all(await dynamodb_client(), new_user_abtests)
 
 
 if __name__ == "__main__":
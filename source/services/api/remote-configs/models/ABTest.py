@@ -7,13 +7,26 @@ from typing import Any
 class ABTest:
     """
     This class represents an ABTest.
+    Fields are converted and validated once : instances are immutable and can be kept
+    in container cache with their RemoteConfig.
     """
 
+    __slots__ = ("__ID", "__salt", "__target_user_percent", "__variants")
+
     def __init__(
         self, remote_config_name: str, audience_name: str, data: dict[str, Any]
     ):
-        self.__data = data
+        try:
+            self.__target_user_percent = int(data["target_user_percent"])
+            self.__variants = tuple(data["variants"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid abtest_value : {e!r}") from e
+        if not 0 <= self.__target_user_percent <= 100:
+            raise ValueError(
+                f"Invalid target_user_percent : {self.__target_user_percent}"
+            )
         self.__ID = f"{remote_config_name}-{audience_name}"
+        self.__salt = str(data.get("salt", ""))
 
     @property
     def ID(self) -> str:
@@ -23,16 +36,24 @@ class ABTest:
         """
         return self.__ID
 
+    @property
+    def salt(self) -> str:
+        """
+        This property returns salt used by deterministic assignment.
+        Changing it reshuffles users between groups.
+        """
+        return self.__salt
+
     @property
     def target_user_percent(self) -> int:
         """
         This property returns target_user_percent.
         """
-        return self.__data["target_user_percent"]
+        return self.__target_user_percent
 
     @property
-    def variants(self) -> list[str]:
+    def variants(self) -> tuple[str, ...]:
         """
         This property returns variants.
         """
-        return self.__data["variants"]
+        return self.__variants
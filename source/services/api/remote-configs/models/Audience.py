@@ -2,17 +2,19 @@
 This module contains Audience class.
 """
 
-import contextlib
+import asyncio
 import os
-from typing import Any, List
-
-from boto3.dynamodb.conditions import Key
-from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource
-
-# Warning : packaging is used by eval()
-from packaging.version import Version  # pylint: disable = unused-import
+from typing import Any, List, TYPE_CHECKING
 
+from models.AudienceCondition import AudienceCondition
+from models.AudienceIndex import AudienceIndex
+from models.UsersAudiencesSnapshot import UsersAudiencesSnapshot
 from utils import constants
+from utils.cache import TTLCache
+from utils.dynamodb import batch_get_items, get_item, query_all
+
+if TYPE_CHECKING:
+    from types_aiobotocore_dynamodb.client import DynamoDBClient
 
 
 class Audience:
@@ -20,49 +22,164 @@ class Audience:
     This class represents an audience.
     """
 
+    # Developer and property_based audience definitions (compiled conditions) by type,
+    # and names of event_based audiences.
+    cache = TTLCache(constants.CACHE_TIMEOUT_SECONDS, "Audience")
+
     def __init__(self, audience_name: str):
         self.__audience_name = audience_name
 
     @staticmethod
-    def developer_audiences(
-        dynamodb: DynamoDBServiceResource, user_data: dict[str, Any]
-    ) -> List["Audience"]:
+    async def developer_audiences(
+        dynamodb: "DynamoDBClient", payloads: dict[str, dict[str, Any]]
+    ) -> dict[str, List["Audience"]]:
         """
-        This static method returns a list of all property_based Audiences for uid.
+        This static method returns developer Audiences of each user of <payloads>.
         """
-        response = Audience.__audiences_table(dynamodb).query(
-            IndexName="type-index",
-            KeyConditionExpression=Key("type").eq("developer"),
+        return Audience.__extract_audiences_from_condition(
+            await Audience.__conditions(dynamodb, "developer"), payloads
+        )
+
+    @staticmethod
+    async def definitions_version(dynamodb: "DynamoDBClient") -> int:
+        """
+        This static method returns the version of audiences definitions.
+        The version is increased by the backoffice every time an audience changes.
+        """
+        item = await get_item(
+            dynamodb,
+            Audience.__audiences_table_name(),
+            {"audience_name": constants.AUDIENCES_VERSION_NAME},
+            "audiences_version",
         )
-        return Audience.__extract_audience_from_condition(response["Items"], user_data)
+        return int(item.get("audiences_version", 0))
 
     @staticmethod
-    def event_based_audiences(
-        dynamodb: DynamoDBServiceResource, uid: str
+    async def event_based_audiences(
+        dynamodb: "DynamoDBClient", uid: str
     ) -> List["Audience"]:
         """
-        This static method returns a list of all event_based Audiences for uid.
+        This static method returns a list of all event_based Audiences for uid,
+        sorted by audience_name (uid-index does not guarantee any order).
+        Memberships come from users audiences snapshot when it is published.
         """
-        response = dynamodb.Table(constants.USERS_AUDIENCES_TABLE).query(
+        if snapshot := await UsersAudiencesSnapshot.from_cache():
+            return [
+                Audience(audience_name)
+                for audience_name in snapshot.audience_names(uid)
+            ]
+
+        items = await query_all(
+            dynamodb,
+            TableName=constants.USERS_AUDIENCES_TABLE,
             IndexName="uid-index",
-            KeyConditionExpression=Key("uid").eq(uid),
+            KeyConditionExpression="uid = :uid",
+            ExpressionAttributeValues={":uid": {"S": uid}},
         )
 
-        return [Audience(item["audience_name"]) for item in response["Items"]]
+        return [
+            Audience(audience_name)
+            for audience_name in sorted(item["audience_name"] for item in items)
+        ]
 
     @staticmethod
-    def property_based_audiences(
-        dynamodb: DynamoDBServiceResource, user_data: dict[str, Any]
-    ) -> List["Audience"]:
+    async def event_based_audience_names(
+        audiences_dynamodb: "DynamoDBClient",
+    ) -> frozenset[str]:
         """
-        This static method returns a list of all property_based Audiences for uid.
+        This static method returns names of all event_based audiences (container cache).
         """
-        response = Audience.__audiences_table(dynamodb).query(
-            IndexName="type-index",
-            KeyConditionExpression=Key("type").eq("property_based"),
+
+        async def load(_: int) -> frozenset[str]:
+            return frozenset(
+                item["audience_name"]
+                for item in await Audience.__items(audiences_dynamodb, "event_based")
+            )
+
+        return await Audience.cache.get(
+            "event_based",
+            loader=load,
+            version_loader=lambda: Audience.definitions_version(audiences_dynamodb),
         )
 
-        return Audience.__extract_audience_from_condition(response["Items"], user_data)
+    @staticmethod
+    async def event_based_audiences_of_users(
+        dynamodb: "DynamoDBClient",
+        audiences_dynamodb: "DynamoDBClient",
+        uids: list[str],
+        audience_names: list[str],
+    ) -> dict[str, List["Audience"]]:
+        """
+        This static method returns event_based Audiences of each uid, among <audience_names>,
+        sorted by audience_name (as event_based_audiences).
+        Memberships come from users audiences snapshot when it is published. Else only
+        event_based audiences of <audience_names> are read : with BatchGetItem of each
+        (uid, audience_name), or with concurrent uid-index queries when there are more
+        audiences than users.
+        """
+        if snapshot := await UsersAudiencesSnapshot.from_cache():
+            return {
+                uid: [
+                    Audience(audience_name)
+                    for audience_name in snapshot.audience_names(uid, audience_names)
+                ]
+                for uid in uids
+            }
+
+        event_based_audience_names = (
+            await Audience.event_based_audience_names(audiences_dynamodb)
+        ).intersection(audience_names)
+        memberships: dict[str, set[str]] = {uid: set() for uid in uids}
+
+        if len(event_based_audience_names) > len(uids):
+            for uid, items in zip(
+                uids,
+                await asyncio.gather(
+                    *(
+                        query_all(
+                            dynamodb,
+                            TableName=constants.USERS_AUDIENCES_TABLE,
+                            IndexName="uid-index",
+                            KeyConditionExpression="uid = :uid",
+                            ExpressionAttributeValues={":uid": {"S": uid}},
+                            ProjectionExpression="audience_name",
+                        )
+                        for uid in uids
+                    )
+                ),
+            ):
+                memberships[uid].update(
+                    item["audience_name"]
+                    for item in items
+                    if item["audience_name"] in event_based_audience_names
+                )
+        else:
+            for item in await batch_get_items(
+                dynamodb,
+                constants.USERS_AUDIENCES_TABLE,
+                [
+                    {"uid": uid, "audience_name": audience_name}
+                    for uid in uids
+                    for audience_name in sorted(event_based_audience_names)
+                ],
+            ):
+                memberships[item["uid"]].add(item["audience_name"])
+
+        return {
+            uid: [Audience(audience_name) for audience_name in sorted(memberships[uid])]
+            for uid in uids
+        }
+
+    @staticmethod
+    async def property_based_audiences(
+        dynamodb: "DynamoDBClient", payloads: dict[str, dict[str, Any]]
+    ) -> dict[str, List["Audience"]]:
+        """
+        This static method returns property_based Audiences of each user of <payloads>.
+        """
+        return Audience.__extract_audiences_from_condition(
+            await Audience.__conditions(dynamodb, "property_based"), payloads
+        )
 
     @property
     def audience_name(self) -> str:
@@ -72,25 +189,62 @@ class Audience:
         return self.__audience_name
 
     @staticmethod
-    def __extract_audience_from_condition(
-        items: list[dict[str, Any]], user_data: dict[str, Any]
-    ):
-        audiences = []
-        for item in items:
-            expression: str = item["condition"]
+    async def __conditions(
+        dynamodb: "DynamoDBClient", audience_type: str
+    ) -> AudienceIndex:
+        """
+        This method returns the index of all <audience_type> audiences conditions.
+        Audiences are loaded, compiled and indexed once, then kept in container cache.
+        Once cache timeout expired, they are loaded again only if their version changed.
+        """
+        return await Audience.cache.get(
+            audience_type,
+            loader=lambda _: Audience.__load_conditions(dynamodb, audience_type),
+            version_loader=lambda: Audience.definitions_version(dynamodb),
+        )
 
-            for parameter_name, parameter_value in user_data.items():
-                expression = expression.replace(parameter_name, f"'{parameter_value}'")
+    @staticmethod
+    def __extract_audiences_from_condition(
+        conditions: AudienceIndex, payloads: dict[str, dict[str, Any]]
+    ) -> dict[str, List["Audience"]]:
+        return {
+            user_ID: [
+                Audience(audience_name)
+                for audience_name in conditions.matching(payload)
+            ]
+            for user_ID, payload in payloads.items()
+        }
 
-            with contextlib.suppress(NameError):
-                # eval() raises NameError if parameter in expression not in user_data
-                if eval(expression) is True:  # pylint: disable=eval-used
-                    audiences.append(Audience(item["audience_name"]))
+    @staticmethod
+    async def __items(
+        dynamodb: "DynamoDBClient", audience_type: str
+    ) -> list[dict[str, Any]]:
+        return await query_all(
+            dynamodb,
+            TableName=Audience.__audiences_table_name(),
+            IndexName="type-index",
+            KeyConditionExpression="#type = :type",
+            ExpressionAttributeNames={"#type": "type"},  # Reserved word
+            ExpressionAttributeValues={":type": {"S": audience_type}},
+        )
 
-        return audiences
+    @staticmethod
+    async def __load_conditions(
+        dynamodb: "DynamoDBClient", audience_type: str
+    ) -> AudienceIndex:
+        conditions = []
+        for item in await Audience.__items(dynamodb, audience_type):
+            try:
+                condition = AudienceCondition.from_condition(item["condition"])
+            except ValueError as e:
+                print(f"ERROR with {item['audience_name']} audience : {e}")
+                continue
+            conditions.append((item["audience_name"], condition))
+
+        return AudienceIndex(conditions)
 
     @staticmethod
-    def __audiences_table(dynamodb: DynamoDBServiceResource):
+    def __audiences_table_name() -> str:
         if os.environ["GEODE_ENVIRONMENT"] in ("dev", "prod"):
-            return dynamodb.Table(constants.AUDIENCES_TABLE_PROD)
-        return dynamodb.Table(constants.AUDIENCES_TABLE_SANDBOX)
+            return constants.AUDIENCES_TABLE_PROD
+        return constants.AUDIENCES_TABLE_SANDBOX
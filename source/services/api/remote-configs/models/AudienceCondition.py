@@ -0,0 +1,312 @@
+"""
+This module contains AudienceCondition class.
+"""
+
+import ast
+from functools import lru_cache
+import operator
+from typing import Any, Callable
+
+from packaging.version import InvalidVersion, Version
+
+
+Predicate = Callable[[dict[str, Any]], Any]
+# ("eq", name, values) : str(payload[name]) must be in values
+# ("version", name, (lower, lower_inclusive, upper, upper_inclusive)) : Version(payload[name])
+# must be in this range (None bound : unbounded)
+Guard = tuple[str, str, Any]
+
+
+class AudienceCondition:
+    """
+    This class represents the condition of a developer or property_based audience.
+    The condition is parsed once into a restricted AST and compiled into a predicate
+    evaluated directly against user payload (no eval()).
+
+    Supported syntax : `and`, `or`, `not`, comparisons (==, !=, <, <=, >, >=, in, not in),
+    str/number literals, lists/tuples of literals and `Version(...)`.
+    A name is replaced by the payload value as string, like the former implementation.
+    """
+
+    __comparators: dict[type, Callable[[Any, Any], bool]] = {
+        ast.Eq: operator.eq,
+        ast.NotEq: operator.ne,
+        ast.Lt: operator.lt,
+        ast.LtE: operator.le,
+        ast.Gt: operator.gt,
+        ast.GtE: operator.ge,
+        ast.In: lambda a, b: a in b,
+        ast.NotIn: lambda a, b: a not in b,
+    }
+    __reversed_operators: dict[type, ast.cmpop] = {
+        ast.Lt: ast.Gt(),
+        ast.LtE: ast.GtE(),
+        ast.Gt: ast.Lt(),
+        ast.GtE: ast.LtE(),
+    }
+
+    def __init__(self, condition: str):
+        self.__condition = condition
+        self.__tree = ast.parse(condition.strip(), mode="eval").body
+        self.__predicate = AudienceCondition.__compile(self.__tree)
+        self.__guard, self.__exact_guard = AudienceCondition.__extract_guard(
+            self.__tree
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def from_condition(condition: str) -> "AudienceCondition":
+        """
+        This static method returns the compiled AudienceCondition of <condition>.
+        Compiled conditions are cached by condition text for the container lifetime.
+        It raises ValueError if <condition> is not supported.
+        """
+        try:
+            return AudienceCondition(condition)
+        except SyntaxError as e:
+            raise ValueError(f"Invalid audience condition : {condition}") from e
+
+    @property
+    def condition(self) -> str:
+        """
+        This property returns condition text.
+        """
+        return self.__condition
+
+    @property
+    def guard(self) -> Guard | None:
+        """
+        This property returns a necessary condition for a payload to match (see Guard),
+        used to index audiences, or None if the condition can not be indexed.
+        """
+        return self.__guard
+
+    @property
+    def exact_guard(self) -> bool:
+        """
+        This property returns True if payloads selected by guard match without evaluation.
+        """
+        return self.__exact_guard
+
+    def matches(self, payload: dict[str, Any]) -> bool:
+        """
+        This method returns True if <payload> matches the condition, else False.
+        A condition which uses a parameter missing from <payload>, compares incompatible
+        types or parses an invalid version does not match.
+        """
+        try:
+            return self.__predicate(payload) is True
+        except (KeyError, TypeError, InvalidVersion):
+            return False
+
+    @staticmethod
+    def __compile(node: ast.expr) -> Predicate:
+        match node:
+            case ast.BoolOp(op=ast.And() | ast.Or() as op, values=values):
+                predicates = [AudienceCondition.__compile(value) for value in values]
+                combine = all if isinstance(op, ast.And) else any
+                return lambda payload: combine(p(payload) for p in predicates)
+            case ast.UnaryOp(op=ast.Not(), operand=operand):
+                predicate = AudienceCondition.__compile(operand)
+                return lambda payload: not predicate(payload)
+            case ast.Compare(left=left, ops=ops, comparators=comparators):
+                return AudienceCondition.__compile_compare(left, ops, comparators)
+            case ast.Name(id=name):
+                return lambda payload: str(payload[name])
+            case ast.Call():
+                return AudienceCondition.__compile_version(node)
+
+        value = AudienceCondition.__literal(node)
+        return lambda payload: value
+
+    @staticmethod
+    def __compile_compare(
+        left: ast.expr, ops: list[ast.cmpop], comparators: list[ast.expr]
+    ) -> Predicate:
+        operands = [AudienceCondition.__compile(left)]
+        functions = []
+        for op, comparator in zip(ops, comparators):
+            if type(op) not in AudienceCondition.__comparators:
+                raise ValueError(f"Unsupported operator : {type(op).__name__}")
+            functions.append(AudienceCondition.__comparators[type(op)])
+            operands.append(AudienceCondition.__compile(comparator))
+
+        if len(functions) == 1 and len(operands) == 2:
+            function = functions[0]
+            get_left, get_right = operands[0], operands[1]
+            return lambda payload: function(get_left(payload), get_right(payload))
+
+        def compare(payload: dict[str, Any]) -> bool:
+            # Chained comparisons (a < b < c) short-circuit like Python.
+            left_value = operands[0](payload)
+            for function, get_right in zip(functions, operands[1:]):
+                right_value = get_right(payload)
+                if not function(left_value, right_value):
+                    return False
+                left_value = right_value
+            return True
+
+        return compare
+
+    @staticmethod
+    def __compile_version(node: ast.Call) -> Predicate:
+        match node:
+            case ast.Call(func=ast.Name(id="Version"), args=[argument], keywords=[]):
+                pass
+            case _:
+                raise ValueError(f"Unsupported call : {ast.unparse(node)}")
+
+        if isinstance(argument, ast.Name):
+            name = argument.id
+            return lambda payload: parse_version(str(payload[name]))
+
+        # Version literals are parsed only once, at compile time.
+        version = parse_version(str(AudienceCondition.__literal(argument)))
+        return lambda payload: version
+
+    @staticmethod
+    def __extract_guard(node: ast.expr) -> tuple[Guard | None, bool]:
+        """
+        This method returns (guard, exact) of <node>. The guard is exact when it is
+        the whole condition : a single ==/in comparison, or version comparisons only.
+        """
+        match node:
+            case ast.BoolOp(op=ast.And(), values=values):
+                # Every operand is necessary.
+                guards = [
+                    AudienceCondition.__extract_guard(value)[0] for value in values
+                ]
+                exact = False
+            case ast.Compare(left=left, ops=ops, comparators=comparators):
+                # a < b < c is necessarily a < b and b < c.
+                operands = [left] + comparators
+                guards = [
+                    AudienceCondition.__extract_compare_guard(
+                        operands[i], op, operands[i + 1]
+                    )
+                    for i, op in enumerate(ops)
+                ]
+                exact = all(guards) and (
+                    len(guards) == 1 or all(guard[0] == "version" for guard in guards)
+                )
+            case _:
+                return None, False
+
+        guards = [guard for guard in guards if guard]
+        if not guards:
+            return None, False
+
+        # Equalities are the most selective, else version ranges of an attribute are
+        # intersected.
+        for guard in guards:
+            if guard[0] == "eq":
+                return guard, exact
+        name = guards[0][1]
+        if exact and any(guard[1] != name for guard in guards):
+            exact = False
+        return (
+            "version",
+            name,
+            AudienceCondition.__intersect_version_ranges(
+                [guard[2] for guard in guards if guard[1] == name]
+            ),
+        ), exact
+
+    @staticmethod
+    def __intersect_version_ranges(version_ranges: list[tuple]) -> tuple:
+        """
+        This method returns the intersection of <version_ranges>
+        ((lower, lower_inclusive, upper, upper_inclusive), None bound : unbounded).
+        """
+        lower, lower_inclusive, upper, upper_inclusive = None, True, None, True
+        for (
+            range_lower,
+            range_lower_inclusive,
+            range_upper,
+            range_upper_inclusive,
+        ) in version_ranges:
+            if range_lower is not None and (
+                lower is None
+                or range_lower > lower
+                or (range_lower == lower and not range_lower_inclusive)
+            ):
+                lower, lower_inclusive = range_lower, range_lower_inclusive
+            if range_upper is not None and (
+                upper is None
+                or range_upper < upper
+                or (range_upper == upper and not range_upper_inclusive)
+            ):
+                upper, upper_inclusive = range_upper, range_upper_inclusive
+        return lower, lower_inclusive, upper, upper_inclusive
+
+    @staticmethod
+    def __extract_compare_guard(
+        left: ast.expr, op: ast.cmpop, right: ast.expr
+    ) -> Guard | None:
+        match left, op, right:
+            case (ast.Name(id=name), ast.Eq(), ast.Constant(value=value)) | (
+                ast.Constant(value=value),
+                ast.Eq(),
+                ast.Name(id=name),
+            ):
+                return ("eq", name, frozenset([value]))
+            case ast.Name(id=name), ast.In(), ast.List() | ast.Tuple() | ast.Set():
+                return ("eq", name, AudienceCondition.__literal(right))
+            case ast.Call(args=[ast.Name(id=name)]), _, ast.Call(
+                args=[ast.Constant(value=value)]
+            ):
+                return AudienceCondition.__version_guard(name, op, value)
+            case ast.Call(args=[ast.Constant(value=value)]), _, ast.Call(
+                args=[ast.Name(id=name)]
+            ):
+                # Version('1.0') < Version(app_version) is Version(app_version) > Version('1.0')
+                return AudienceCondition.__version_guard(
+                    name,
+                    AudienceCondition.__reversed_operators.get(type(op), op),
+                    value,
+                )
+        return None
+
+    @staticmethod
+    def __version_guard(name: str, op: ast.cmpop, value: Any) -> Guard | None:
+        """
+        This method returns the guard of Version(<name>) <op> Version(<value>).
+        """
+        version = parse_version(str(value))
+        match op:
+            case ast.Eq():
+                return ("version", name, (version, True, version, True))
+            case ast.Gt() | ast.GtE():
+                return ("version", name, (version, isinstance(op, ast.GtE), None, True))
+            case ast.Lt() | ast.LtE():
+                return ("version", name, (None, True, version, isinstance(op, ast.LtE)))
+        return None
+
+    @staticmethod
+    def __literal(node: ast.expr) -> Any:
+        match node:
+            case ast.Constant(value=value) if isinstance(
+                value, (str, int, float, bool, type(None))
+            ):
+                return value
+            case ast.UnaryOp(
+                op=ast.USub(), operand=ast.Constant(value=int() | float() as value)
+            ):
+                return -value
+            case ast.List(elts=elements) | ast.Tuple(elts=elements) | ast.Set(
+                elts=elements
+            ):
+                # frozenset keeps `in` constant-time for long lists (e.g. developer uids)
+                return frozenset(
+                    AudienceCondition.__literal(element) for element in elements
+                )
+
+        raise ValueError(f"Unsupported expression : {ast.unparse(node)}")
+
+
+@lru_cache(maxsize=4096)
+def parse_version(version: str) -> Version:
+    """
+    This function returns parsed <version>, memoized for the container lifetime.
+    """
+    return Version(version)
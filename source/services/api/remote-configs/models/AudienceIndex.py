@@ -0,0 +1,111 @@
+"""
+This module contains AudienceIndex class.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any
+
+from packaging.version import InvalidVersion, Version
+
+from models.AudienceCondition import AudienceCondition, parse_version
+
+
+class AudienceIndex:  # pylint: disable=too-few-public-methods
+    """
+    This class represents compiled conditions of audiences, indexed by their guard
+    (see AudienceCondition.guard) : by attribute and equality value, and by version
+    ranges. Only candidate audiences are evaluated against a payload, and not even
+    them when their guard is the whole condition.
+
+    Version ranges of an attribute are split into elementary segments between their
+    sorted bounds : (-inf, b0), [b0], (b0, b1), [b1], ..., (bn, +inf). Each segment
+    lists the audiences whose range covers it, so a version lookup is a bisection.
+    """
+
+    def __init__(self, conditions: list[tuple[str, AudienceCondition]]):
+        self.__conditions = conditions
+        self.__exact_guards = [condition.exact_guard for _, condition in conditions]
+        self.__unindexed: list[int] = []
+        # name -> value -> positions of conditions
+        self.__equalities: dict[str, dict[Any, list[int]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        # name -> (sorted bounds, positions of conditions by segment)
+        self.__versions: dict[str, tuple[list[Version], list[list[int]]]] = {}
+
+        ranges: dict[str, list[tuple[int, tuple]]] = defaultdict(list)
+        for position, (_, condition) in enumerate(conditions):
+            match condition.guard:
+                case ("eq", name, values):
+                    for value in values:
+                        self.__equalities[name][value].append(position)
+                case ("version", name, version_range):
+                    ranges[name].append((position, version_range))
+                case _:
+                    self.__unindexed.append(position)
+
+        for name, name_ranges in ranges.items():
+            self.__versions[name] = AudienceIndex.__version_segments(name_ranges)
+
+    def matching(self, payload: dict[str, Any]) -> list[str]:
+        """
+        This method returns names of audiences matching <payload> (conditions order).
+        """
+        candidates = set(self.__unindexed)
+
+        for name, positions_by_value in self.__equalities.items():
+            if name in payload:
+                candidates.update(positions_by_value.get(str(payload[name]), ()))
+
+        for name, (bounds, segments) in self.__versions.items():
+            if name not in payload:
+                continue
+            try:
+                version = parse_version(str(payload[name]))
+            except InvalidVersion:
+                continue  # Conditions on this version can not match.
+
+            i = bisect_left(bounds, version)
+            exact_bound = i < len(bounds) and bounds[i] == version
+            candidates.update(segments[2 * i + (1 if exact_bound else 0)])
+
+        return [
+            self.__conditions[position][0]
+            for position in sorted(candidates)
+            if self.__exact_guards[position]
+            or self.__conditions[position][1].matches(payload)
+        ]
+
+    @staticmethod
+    def __version_segments(
+        name_ranges: list[tuple[int, tuple]]
+    ) -> tuple[list[Version], list[list[int]]]:
+        """
+        This method returns (sorted bounds, positions of conditions by segment) of
+        version ranges of an attribute (see AudienceIndex).
+        """
+        bounds = sorted(
+            {
+                bound
+                for _, (lower, _, upper, _) in name_ranges
+                for bound in (lower, upper)
+                if bound is not None
+            }
+        )
+        bound_indexes = {bound: i for i, bound in enumerate(bounds)}
+        segments: list[list[int]] = [[] for _ in range(2 * len(bounds) + 1)]
+        for position, (lower, lower_inclusive, upper, upper_inclusive) in name_ranges:
+            first = (
+                0
+                if lower is None
+                else 2 * bound_indexes[lower] + (1 if lower_inclusive else 2)
+            )
+            last = (
+                len(segments) - 1
+                if upper is None
+                else 2 * bound_indexes[upper] + (1 if upper_inclusive else 0)
+            )
+            for segment in range(first, last + 1):
+                segments[segment].append(position)
+        return bounds, segments
@@ -2,63 +2,158 @@
 This module contains RemoteConfig class.
 """
 
-from typing import Any, List
-
-from boto3.dynamodb.conditions import Attr
-from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource
+from types import MappingProxyType
+from typing import Any, List, Mapping, TYPE_CHECKING
 
 from models.RemoteConfigOverride import RemoteConfigOverride
 from utils import constants
+from utils.dynamodb import batch_get_items, get_item, scan_all
+
+if TYPE_CHECKING:
+    from types_aiobotocore_dynamodb.client import DynamoDBClient
 
 
 class RemoteConfig:
     """
     This class represents a RemoteConfig.
+    Fields are converted and validated once at load : instances are immutable and
+    are kept in container cache by RemoteConfigCatalog.
     """
 
+    __slots__ = (
+        "__abtest_assignment",
+        "__new_users_threshold",
+        "__overrides",
+        "__reference_value",
+        "__remote_config_name",
+    )
+
     def __init__(self, data: dict[str, Any]):
-        self.__data = data
-        self.__data["overrides"] = {
-            audience_name: RemoteConfigOverride(override)
-            for audience_name, override in self.__data["overrides"].items()
-        }
+        try:
+            self.__remote_config_name = data["remote_config_name"]
+            self.__new_users_threshold = int(data["new_users_threshold"])
+            self.__reference_value = data["reference_value"]
+            overrides = data["overrides"].items()
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid remote config : {e!r}") from e
+
+        self.__abtest_assignment = data.get("abtest_assignment", "random")
+        self.__overrides = MappingProxyType(
+            {
+                audience_name: RemoteConfigOverride(
+                    self.__remote_config_name, audience_name, override
+                )
+                for audience_name, override in overrides
+            }
+        )
+
+    @staticmethod
+    async def catalog_version(dynamodb: "DynamoDBClient", application_ID: str) -> int:
+        """
+        This static method returns the version of RemoteConfigs catalog for application_ID.
+        The version is increased by the backoffice every time a RemoteConfig of this
+        application changes.
+        """
+        item = await get_item(
+            dynamodb,
+            constants.REMOTE_CONFIGS_APPLICATIONS_TABLE,
+            {"application_id": application_ID},
+            "catalog_version",
+        )
+        return int(item.get("catalog_version", 0))
 
     @staticmethod
-    def get_all(
-        dynamodb: DynamoDBServiceResource, application_ID: str
+    async def get_all(
+        dynamodb: "DynamoDBClient", application_ID: str
     ) -> List["RemoteConfig"]:
         """
-        This method returns all RemoteConfigs.
+        This method returns all RemoteConfigs of application_ID.
+        RemoteConfigs are read by key thanks to remote-configs-applications index.
+        Applications not indexed yet by the backoffice fall back to a table scan, with a
+        warning : all of them are indexed by the backoffice backfill.
+        RemoteConfigs are checked against their own applications : a stale index
+        never serves a RemoteConfig to an application it was removed from.
         """
-        response = dynamodb.Table(constants.REMOTE_CONFIGS_TABLE).scan(
-            FilterExpression=Attr("applications").contains(application_ID),
+        item = await get_item(
+            dynamodb,
+            constants.REMOTE_CONFIGS_APPLICATIONS_TABLE,
+            {"application_id": application_ID},
+            "is_indexed, remote_config_names",
         )
-        return [RemoteConfig(item) for item in response["Items"]]
+        if not item.get("is_indexed"):
+            print(
+                f"WARNING {application_ID} application is not indexed, remote configs are"
+                " scanned (see analytics-backoffice `index-applications` command)."
+            )
+            return await RemoteConfig.__scan_all(dynamodb, application_ID)
+
+        items = await batch_get_items(
+            dynamodb,
+            constants.REMOTE_CONFIGS_TABLE,
+            [
+                {"remote_config_name": remote_config_name}
+                for remote_config_name in sorted(item.get("remote_config_names", []))
+            ],
+        )
+        return RemoteConfig.__parse_all(
+            [item for item in items if application_ID in item.get("applications", [])]
+        )
+
+    @property
+    def abtest_assignment(self) -> str:
+        """
+        This method returns abtest_assignment ("random" or "deterministic").
+        """
+        return self.__abtest_assignment
 
     @property
     def new_users_threshold(self) -> int:
         """
         This method returns new_users_threshold.
         """
-        return int(self.__data["new_users_threshold"])
+        return self.__new_users_threshold
 
     @property
-    def overrides(self) -> dict[str, RemoteConfigOverride]:
+    def overrides(self) -> Mapping[str, RemoteConfigOverride]:
         """
         This method returns overrides.
         """
-        return self.__data["overrides"]
+        return self.__overrides
 
     @property
     def reference_value(self) -> str:
         """
         This method returns reference_value.
         """
-        return self.__data["reference_value"]
+        return self.__reference_value
 
     @property
     def remote_config_name(self) -> str:
         """
         This method returns remote_config_name.
         """
-        return self.__data["remote_config_name"]
+        return self.__remote_config_name
+
+    @staticmethod
+    def __parse_all(items: list[dict[str, Any]]) -> List["RemoteConfig"]:
+        remote_configs = []
+        for item in items:
+            try:
+                remote_configs.append(RemoteConfig(item))
+            except ValueError as e:
+                print(
+                    f"ERROR with {item.get('remote_config_name')} remote config : {e}"
+                )
+        return remote_configs
+
+    @staticmethod
+    async def __scan_all(
+        dynamodb: "DynamoDBClient", application_ID: str
+    ) -> List["RemoteConfig"]:
+        items = await scan_all(
+            dynamodb,
+            TableName=constants.REMOTE_CONFIGS_TABLE,
+            FilterExpression="contains(applications, :application_ID)",
+            ExpressionAttributeValues={":application_ID": {"S": application_ID}},
+        )
+        return RemoteConfig.__parse_all(items)
@@ -0,0 +1,133 @@
+"""
+This module contains RemoteConfigCatalog class.
+"""
+
+from collections import defaultdict
+import hashlib
+import json
+from typing import Any, TYPE_CHECKING
+
+from models.RemoteConfig import RemoteConfig
+from models.RemoteConfigOverride import RemoteConfigOverride
+from utils import constants
+from utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from types_aiobotocore_dynamodb.client import DynamoDBClient
+
+
+Decision = tuple[RemoteConfig, str | None, RemoteConfigOverride | None]
+
+
+class RemoteConfigCatalog:
+    """
+    This class represents all RemoteConfigs of an application.
+    At load time, it is compiled into a decision table which maps each audience_name
+    to the active overrides this audience can win (RemoteConfigs order).
+    """
+
+    cache = TTLCache(constants.CACHE_TIMEOUT_SECONDS, "RemoteConfigCatalog")
+
+    def __init__(self, remote_configs: list[RemoteConfig], version: int = 0):
+        self.__version = version
+        self.__remote_configs = [
+            (remote_config, remote_config.new_users_threshold)
+            for remote_config in remote_configs
+        ]
+        self.__overrides_by_audience: dict[
+            str, list[tuple[RemoteConfig, int, RemoteConfigOverride]]
+        ] = defaultdict(list)
+
+        for remote_config, new_users_threshold in self.__remote_configs:
+            for audience_name, override in remote_config.overrides.items():
+                if override.active:
+                    self.__overrides_by_audience[audience_name].append(
+                        (remote_config, new_users_threshold, override)
+                    )
+
+    @staticmethod
+    async def from_cache(
+        dynamodb: "DynamoDBClient", application_ID: str
+    ) -> "RemoteConfigCatalog":
+        """
+        This static method returns RemoteConfigCatalog of application_ID from container cache.
+        Once cache timeout expired, the catalog is loaded again only if its version changed.
+        """
+
+        async def load(version: int) -> "RemoteConfigCatalog":
+            return RemoteConfigCatalog(
+                await RemoteConfig.get_all(dynamodb, application_ID), version
+            )
+
+        return await RemoteConfigCatalog.cache.get(
+            application_ID,
+            loader=load,
+            version_loader=lambda: RemoteConfig.catalog_version(
+                dynamodb, application_ID
+            ),
+        )
+
+    @property
+    def audience_names(self) -> list[str]:
+        """
+        This property returns names of audiences with at least one active override.
+        Other audiences can not change any value.
+        """
+        return list(self.__overrides_by_audience)
+
+    @property
+    def remote_configs(self) -> list[RemoteConfig]:
+        """
+        This property returns all RemoteConfigs of the catalog.
+        """
+        return [remote_config for remote_config, _ in self.__remote_configs]
+
+    @property
+    def version(self) -> int:
+        """
+        This property returns the catalog version it was loaded at.
+        """
+        return self.__version
+
+    def fingerprint(self, result: dict[str, Any]) -> str:
+        """
+        This method returns a stable fingerprint of a user <result> at this catalog version.
+        Clients send it back : the same fingerprint means the same values.
+        """
+        return hashlib.sha256(
+            json.dumps([self.__version, result], sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def resolve(
+        self, audience_names: list[str], start_first_session_date: int
+    ) -> list[Decision]:
+        """
+        This method returns (remote_config, audience_name, override) for each RemoteConfig
+        the user is eligible to. <audience_names> are sorted by priority : the first one
+        with an active override wins. audience_name and override are None when no
+        active override matches user audiences.
+        """
+        decisions: dict[str, Decision] = {}
+
+        for audience_name in audience_names:
+            for (
+                remote_config,
+                new_users_threshold,
+                override,
+            ) in self.__overrides_by_audience.get(audience_name, ()):
+                if start_first_session_date < new_users_threshold:
+                    # The user is NOT considered a "New User" for this Remote Config
+                    continue
+                decisions.setdefault(
+                    remote_config.remote_config_name,
+                    (remote_config, audience_name, override),
+                )
+
+        for remote_config, new_users_threshold in self.__remote_configs:
+            if start_first_session_date < new_users_threshold:
+                continue
+            decisions.setdefault(
+                remote_config.remote_config_name, (remote_config, None, None)
+            )
+
+        return list(decisions.values())
@@ -3,39 +3,68 @@ This module contains RemoteConfigOverride class.
 """
 from typing import Any
 
+from models.ABTest import ABTest
+
 
 class RemoteConfigOverride:
     """
     This class represents a remote config override.
+    Fields are converted and validated once : instances are immutable.
     """
 
-    def __init__(self, data: dict[str, Any]):
-        self.__data = data
+    __slots__ = ("__abtest", "__active", "__fixed_value", "__override_type")
+
+    def __init__(
+        self, remote_config_name: str, audience_name: str, data: dict[str, Any]
+    ):
+        try:
+            self.__active = int(data["active"]) == 1
+            self.__override_type = data["override_type"]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid {audience_name} override : {e!r}") from e
+
+        self.__abtest = None
+        self.__fixed_value = data.get("fixed_value")
+        if not self.__active:
+            # Inactive overrides are never resolved : they are not validated further.
+            return
+
+        match self.__override_type:
+            case "abtest":
+                self.__abtest = ABTest(
+                    remote_config_name, audience_name, data.get("abtest_value") or {}
+                )
+            case "fixed":
+                pass
+            case _:
+                raise ValueError(
+                    f"Invalid {audience_name} override_type : {self.__override_type}"
+                )
 
     @property
-    def abtest_value(self) -> dict[str, Any] | None:
+    def abtest(self) -> ABTest | None:
         """
-        This property returns abtest_value.
+        This property returns ABTest of an active "abtest" override, else None.
         """
-        return self.__data.get("abtest_value")
+        return self.__abtest
 
     @property
     def active(self) -> bool:
         """
         This property returns True if Override is active, else False.
         """
-        return int(self.__data["active"]) == 1
+        return self.__active
 
     @property
     def fixed_value(self) -> str | None:
         """
         This property returns fixed_value.
         """
-        return self.__data.get("fixed_value")
+        return self.__fixed_value
 
     @property
     def override_type(self) -> str:
         """
         This property retus override_type.
         """
-        return self.__data["override_type"]
+        return self.__override_type
@@ -1,12 +1,16 @@
 """
 This module contains UserABTest class.
 """
+import hashlib
 import random
-
-from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource
+from typing import Any, List, TYPE_CHECKING
 
 from models.ABTest import ABTest
 from utils import constants
+from utils.dynamodb import batch_get_items, batch_put_items
+
+if TYPE_CHECKING:
+    from types_aiobotocore_dynamodb.client import DynamoDBClient
 
 
 class UserABTest:
@@ -14,21 +18,50 @@ class UserABTest:
     This class represents all ABTests groups for a user.
     """
 
-    def __init__(self, dynamodb: DynamoDBServiceResource, uid: str, abtest: ABTest):
+    def __init__(self, uid: str, abtest: ABTest, item: dict[str, Any] | None = None):
         self.__abtest = abtest
         self.__uid = uid
-        self.__dynamodb = dynamodb
 
-        response = dynamodb.Table(constants.USERS_ABTESTS_TABLE).get_item(
-            Key={"uid": uid, "abtest_ID": abtest.ID}
-        )
-        if item := response.get("Item"):
+        if item:
             self.__data = item
             self.__exists = True
         else:
             self.__data = {}
             self.__exists = False
 
+    @staticmethod
+    async def get_all(
+        dynamodb: "DynamoDBClient", keys: list[tuple[str, ABTest]]
+    ) -> List["UserABTest"]:
+        """
+        This static method returns UserABTests for each (uid, ABTest) of <keys> (same order).
+        All groups are fetched with BatchGetItem, whatever the number of users and ABTests.
+        """
+        if not keys:
+            return []
+
+        items = await batch_get_items(
+            dynamodb,
+            constants.USERS_ABTESTS_TABLE,
+            [{"uid": uid, "abtest_ID": abtest.ID} for uid, abtest in keys],
+        )
+        items_by_key = {(item["uid"], item["abtest_ID"]): item for item in items}
+        return [
+            UserABTest(uid, abtest, items_by_key.get((uid, abtest.ID)))
+            for uid, abtest in keys
+        ]
+
+    @staticmethod
+    async def save_all(dynamodb: "DynamoDBClient", user_abtests: List["UserABTest"]):
+        """
+        This static method persists <user_abtests> groups with concurrent batched writes.
+        """
+        await batch_put_items(
+            dynamodb,
+            constants.USERS_ABTESTS_TABLE,
+            [user_abtest.to_dict() for user_abtest in user_abtests],
+        )
+
     @property
     def exists(self) -> bool:
         """
@@ -50,23 +83,43 @@ class UserABTest:
         """
         return self.__data["value"]
 
-    def set_group(self, reference_value: str):
+    def set_group(self, reference_value: str, deterministic: bool = False):
         """
         This method sets user in abtest group.
+        A random group should be persisted by UserABTest.save_all() to be kept.
+        A deterministic group is derived from a stable hash of (uid, ABTest ID, salt):
+        the user always gets the same group without any database I/O.
         """
+        values = [reference_value, *self.__abtest.variants]
+
+        if deterministic:
+            digest = hashlib.sha256(
+                f"{self.__uid}:{self.__abtest.ID}:{self.__abtest.salt}".encode()
+            ).digest()
+            bucket = int.from_bytes(digest[:8], "big")
+            # Two independent draws : bucket % 100 for is_in_test, the rest for value.
+            self.__data["is_in_test"] = bucket % 100 < self.__abtest.target_user_percent
+            self.__data["value"] = (
+                values[(bucket // 100) % len(values)]
+                if self.is_in_test
+                else reference_value
+            )
+            return
+
         self.__data["is_in_test"] = (
             random.randint(0, 99) < self.__abtest.target_user_percent
         )
         self.__data["value"] = (
-            random.choice([reference_value] + self.__abtest.variants)
-            if self.is_in_test
-            else reference_value
-        )
-        self.__dynamodb.Table(constants.USERS_ABTESTS_TABLE).put_item(
-            Item={
-                "uid": self.__uid,
-                "abtest_ID": self.__abtest.ID,
-                "is_in_test": self.is_in_test,
-                "value": self.value,
-            }
+            random.choice(values) if self.is_in_test else reference_value
         )
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        This method returns a dict that represents the UserABTest (database item).
+        """
+        return {
+            "uid": self.__uid,
+            "abtest_ID": self.__abtest.ID,
+            "is_in_test": self.is_in_test,
+            "value": self.value,
+        }
@@ -0,0 +1,153 @@
+"""
+This module contains UsersAudiencesSnapshot class.
+"""
+
+from array import array
+from bisect import bisect_left
+import hashlib
+import json
+import struct
+import sys
+from time import time
+from typing import Iterable
+
+from botocore.exceptions import ClientError
+
+from utils import constants
+from utils.cache import TTLCache
+from utils.s3 import s3_client
+
+
+class UsersAudiencesSnapshot:
+    """
+    This class represents event_based audiences memberships, published once a day to S3
+    by users-audiences Lambda (layout : see users-audiences utils/snapshot.py).
+    It is loaded once per container and answers memberships with a binary search
+    in sorted uid hashes, instead of querying users-audiences table.
+    A membership takes 12 bytes of memory : MemorySize bounds published memberships
+    (about 10 millions with 256 MB).
+    """
+
+    MAGIC = b"GUAS"
+    FORMAT_VERSION = 1
+    PREAMBLE = struct.Struct("<4sII")
+
+    cache = TTLCache(constants.CACHE_TIMEOUT_SECONDS, "UsersAudiencesSnapshot")
+
+    def __init__(self, snapshot: bytes):
+        magic, format_version, header_size = self.PREAMBLE.unpack_from(snapshot)
+        if magic != self.MAGIC or format_version != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot (format version {format_version})")
+
+        header = json.loads(
+            snapshot[self.PREAMBLE.size : self.PREAMBLE.size + header_size]
+        )
+        data_start = self.PREAMBLE.size + header_size
+        data = memoryview(snapshot)[data_start + (-data_start % 8) :]
+
+        self.__version: int = header["version"]
+        # audience_name -> (sorted uid hashes, expires timestamps).
+        self.__audiences = {
+            audience_name: (
+                self.__little_endian(data[offset : offset + 8 * count], "Q"),
+                self.__little_endian(
+                    data[offset + 8 * count : offset + 12 * count], "I"
+                ),
+            )
+            for audience_name, (offset, count) in header["audiences"].items()
+        }
+
+    @staticmethod
+    async def from_cache() -> "UsersAudiencesSnapshot | None":
+        """
+        This static method returns the published snapshot from container cache, or None
+        if there is none (or if USERS_AUDIENCES_SNAPSHOT_KEY is empty).
+        Once cache timeout expired, the snapshot is downloaded again only if its ETag changed.
+        """
+        if not constants.USERS_AUDIENCES_SNAPSHOT_KEY:
+            return None
+
+        return await UsersAudiencesSnapshot.cache.get(
+            constants.USERS_AUDIENCES_SNAPSHOT_KEY,
+            loader=UsersAudiencesSnapshot.__download,
+            version_loader=UsersAudiencesSnapshot.__etag,
+        )
+
+    @property
+    def version(self) -> int:
+        """
+        This property returns snapshot version (publication timestamp).
+        """
+        return self.__version
+
+    def audience_names(
+        self, uid: str, audience_names: Iterable[str] | None = None
+    ) -> list[str]:
+        """
+        This method returns names of audiences uid belongs to, sorted by audience_name.
+        Only <audience_names> are looked up, if given.
+        """
+        uid_hash = int.from_bytes(
+            hashlib.blake2b(uid.encode(), digest_size=8).digest(), "little"
+        )
+        now = time()
+
+        names = []
+        for audience_name in (
+            self.__audiences if audience_names is None else audience_names
+        ):
+            if audience_name not in self.__audiences:
+                continue
+            uid_hashes, expires_timestamps = self.__audiences[audience_name]
+            i = bisect_left(uid_hashes, uid_hash)
+            if (
+                i < len(uid_hashes)
+                and uid_hashes[i] == uid_hash
+                and expires_timestamps[i] > now
+            ):
+                names.append(audience_name)
+
+        return sorted(names)
+
+    @staticmethod
+    def __little_endian(data: memoryview, typecode: str) -> memoryview | array:
+        # Snapshot is little-endian : it is read without any copy on little-endian
+        # platforms, and copied then swapped on others.
+        if sys.byteorder == "little":
+            return data.cast(typecode)
+        values = array(typecode, data)
+        values.byteswap()
+        return values
+
+    @staticmethod
+    async def __etag() -> str | None:
+        s3 = await s3_client()
+        try:
+            return (
+                await s3.head_object(
+                    Bucket=constants.USERS_AUDIENCES_SNAPSHOT_BUCKET,
+                    Key=constants.USERS_AUDIENCES_SNAPSHOT_KEY,
+                )
+            )["ETag"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "404":  # Not published yet
+                print(f"ERROR with users audiences snapshot : {e}")
+            return None
+
+    @staticmethod
+    async def __download(etag: str | None) -> "UsersAudiencesSnapshot | None":
+        if etag is None:
+            return None
+
+        s3 = await s3_client()
+        response = await s3.get_object(
+            Bucket=constants.USERS_AUDIENCES_SNAPSHOT_BUCKET,
+            Key=constants.USERS_AUDIENCES_SNAPSHOT_KEY,
+        )
+        async with response["Body"] as body:
+            snapshot = await body.read()
+        try:
+            return UsersAudiencesSnapshot(snapshot)
+        except ValueError as e:
+            print(f"ERROR with users audiences snapshot : {e}")
+            return None
@@ -22,8 +22,13 @@ export AUDIENCES_TABLE_PROD="$PROJECT_NAME-prod-audiences"
 export AUDIENCES_TABLE_DEV="$PROJECT_NAME-dev-audiences"
 export AUDIENCES_TABLE_SANDBOX="$PROJECT_NAME-sandbox-audiences"
 export REMOTE_CONFIGS_TABLE="$PROJECT_NAME-$GEODE_ENVIRONMENT-remote-configs"
+export REMOTE_CONFIGS_APPLICATIONS_TABLE="$PROJECT_NAME-$GEODE_ENVIRONMENT-remote-configs-applications"
 export USERS_ABTESTS_TABLE="$PROJECT_NAME-$GEODE_ENVIRONMENT-users-abtests"
 export USERS_AUDIENCES_TABLE="$PROJECT_NAME-$GEODE_ENVIRONMENT-users-audiences"
+export USERS_AUDIENCES_SNAPSHOT_BUCKET="$PROJECT_NAME-$GEODE_ENVIRONMENT-analyticsbucket"
+export USERS_AUDIENCES_SNAPSHOT_KEY="users_audiences/snapshot.bin"
+export CACHE_TIMEOUT_SECONDS=60
+export ABTESTS_AUDIT_LOG="false"
 
 if [ ! -d .venv ]; then
     echo "Virtual environment creation processing...\n"
@@ -32,11 +37,11 @@ fi
 
 source .venv/bin/activate
 
-if ! cmp -s requirements.txt .venv/requirements.txt; then
+if ! cat requirements.txt local_requirements.txt | cmp -s - .venv/requirements.txt; then
     echo "Updating local dependencies...\n"
     pip install --upgrade pip
-    pip install -r requirements.txt >/dev/null
-    cp requirements.txt .venv/requirements.txt
+    pip install -r local_requirements.txt >/dev/null
+    cat requirements.txt local_requirements.txt > .venv/requirements.txt
 fi
 
 python main.py $@
@@ -0,0 +1,31 @@
+"""
+Unit tests of remote-configs Lambda. Run them from remote-configs directory :
+`python -m pytest tests` (tests are not deployed).
+"""
+
+# benchmarks set the same Lambda environment (with their own table names).
+# pylint: disable=duplicate-code
+
+import os
+
+
+# Lambda environment, required before importing Lambda modules.
+for variable, value in {
+    "ABTESTS_AUDIT_LOG": "false",
+    "AUDIENCES_TABLE_PROD": "test-prod-audiences",
+    "AUDIENCES_TABLE_DEV": "test-dev-audiences",
+    "AUDIENCES_TABLE_SANDBOX": "test-sandbox-audiences",
+    "AWS_DEFAULT_REGION": "eu-west-2",
+    "CACHE_TIMEOUT_SECONDS": "60",
+    "DEV_REGION": "eu-west-3",
+    "GEODE_ENVIRONMENT": "sandbox",
+    "PROD_REGION": "eu-west-1",
+    "REMOTE_CONFIGS_TABLE": "test-remote-configs",
+    "REMOTE_CONFIGS_APPLICATIONS_TABLE": "test-remote-configs-applications",
+    "SANDBOX_REGION": "eu-west-2",
+    "USERS_ABTESTS_TABLE": "test-users-abtests",
+    "USERS_AUDIENCES_TABLE": "test-users-audiences",
+    "USERS_AUDIENCES_SNAPSHOT_BUCKET": "test-analyticsbucket",
+    "USERS_AUDIENCES_SNAPSHOT_KEY": "",
+}.items():
+    os.environ.setdefault(variable, value)
@@ -0,0 +1,128 @@
+"""
+Tests of AudienceCondition against the former evaluator (str.replace + eval).
+"""
+
+import contextlib
+import itertools
+from typing import Any
+
+# Warning : packaging is used by eval()
+from packaging.version import Version  # pylint: disable = unused-import
+import pytest
+
+from models.AudienceCondition import AudienceCondition
+
+
+CONDITIONS = [
+    "country == 'FR'",
+    "country != 'FR'",
+    "country in ['FR', 'BE', 'CH']",
+    "country not in ('FR', 'BE')",
+    "not (country == 'US')",
+    "language == 'fr' and country in ['FR', 'BE']",
+    "platform == 'ios' and Version(app_version) >= Version('1.2.0')",
+    "Version(app_version) < Version('2.0') or platform == 'android'",
+    "Version('1.0') < Version(app_version) <= Version('1.10')",
+    "Version(app_version) == Version('1.10.0')",
+    "user_id in ['user-1', 'user-2']",
+]
+PAYLOADS = [
+    {
+        "country": "FR",
+        "platform": "ios",
+        "app_version": "1.2.0",
+        "language": "fr",
+        "user_id": "user-1",
+    },
+    {
+        "country": "US",
+        "platform": "android",
+        "app_version": "1.10",
+        "language": "en",
+        "user_id": "user-3",
+    },
+    {
+        "country": "BE",
+        "platform": "ios",
+        "app_version": "2.1.3",
+        "language": "fr",
+        "user_id": "user-2",
+    },
+    # Missing parameters never match.
+    {"country": "CH"},
+    {},
+]
+
+
+def former_matches(condition: str, payload: dict[str, Any]) -> bool:
+    """
+    This function evaluates <condition> like Audience did before AudienceCondition.
+    """
+    expression = condition
+    for parameter_name, parameter_value in payload.items():
+        expression = expression.replace(parameter_name, f"'{parameter_value}'")
+
+    with contextlib.suppress(NameError):
+        # eval() raises NameError if parameter in expression not in payload
+        return eval(expression) is True  # pylint: disable=eval-used
+    return False
+
+
+@pytest.mark.parametrize(
+    "condition, payload", list(itertools.product(CONDITIONS, PAYLOADS))
+)
+def test_matches_like_former_evaluator(condition: str, payload: dict[str, Any]):
+    """
+    A compiled condition matches like str.replace + eval().
+    """
+    assert AudienceCondition.from_condition(condition).matches(
+        payload
+    ) == former_matches(condition, payload)
+
+
+@pytest.mark.parametrize(
+    "condition",
+    [
+        "__import__('os').system('true')",
+        "country.upper() == 'FR'",
+        "[c for c in country]",
+        "country ==",
+    ],
+)
+def test_unsupported_condition(condition: str):
+    """
+    Calls, attributes and invalid syntax are rejected at compile time.
+    """
+    with pytest.raises(ValueError):
+        AudienceCondition.from_condition(condition)
+
+
+def test_invalid_version_does_not_match():
+    """
+    An invalid payload version does not match, instead of raising.
+    """
+    condition = AudienceCondition.from_condition(
+        "Version(app_version) >= Version('1.0')"
+    )
+    assert not condition.matches({"app_version": "not a version"})
+
+
+def test_guard():
+    """
+    Guards keep equalities first, else the intersection of version ranges.
+    """
+    condition = AudienceCondition.from_condition(
+        "country in ['FR', 'BE'] and Version(app_version) >= Version('1.2')"
+    )
+    assert condition.guard == ("eq", "country", frozenset(["FR", "BE"]))
+    assert not condition.exact_guard
+
+    condition = AudienceCondition.from_condition(
+        "Version('1.0') < Version(app_version) <= Version('1.10')"
+    )
+    assert condition.guard == (
+        "version",
+        "app_version",
+        (Version("1.0"), False, Version("1.10"), True),
+    )
+    assert condition.exact_guard
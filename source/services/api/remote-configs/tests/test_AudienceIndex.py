@@ -0,0 +1,95 @@
+"""
+Tests of AudienceIndex against the evaluation of every compiled condition.
+"""
+
+import random
+
+import pytest
+
+from models.AudienceCondition import AudienceCondition
+from models.AudienceIndex import AudienceIndex
+
+
+COUNTRIES = ["FR", "DE", "US", "JP", "BE"]
+OPERATORS = ["==", "<", "<=", ">", ">="]
+
+
+def random_version(rng: random.Random) -> str:
+    """
+    This function returns a version of 1 to 3 parts, often equal to another one
+    (e.g. '1.2' == '1.2.0') : bounds and payload versions collide.
+    """
+    return ".".join(str(rng.randint(0, 3)) for _ in range(rng.randint(1, 3)))
+
+
+def random_condition(rng: random.Random) -> str:
+    """
+    This function returns a random condition of equalities and version ranges, with
+    guards of every kind : eq, version range, intersected ranges, and none.
+    """
+    atoms = [
+        lambda: f"country == '{rng.choice(COUNTRIES)}'",
+        lambda: f"'{rng.choice(COUNTRIES)}' == country",
+        lambda: f"country in {rng.sample(COUNTRIES, rng.randint(1, 3))}",
+        lambda: f"country != '{rng.choice(COUNTRIES)}'",
+        lambda: f"platform == '{rng.choice(['ios', 'android'])}'",
+        lambda: (
+            f"Version(app_version) {rng.choice(OPERATORS)}"
+            f" Version('{random_version(rng)}')"
+        ),
+        lambda: (
+            f"Version('{random_version(rng)}') {rng.choice(OPERATORS)}"
+            f" Version(app_version)"
+        ),
+        lambda: (
+            f"Version('{random_version(rng)}') {rng.choice(['<', '<='])}"
+            f" Version(app_version) {rng.choice(['<', '<='])}"
+            f" Version('{random_version(rng)}')"
+        ),
+        lambda: f"Version(os_version) >= Version('{rng.randint(10, 14)}')",
+    ]
+    operands = [rng.choice(atoms)() for _ in range(rng.randint(1, 3))]
+    return rng.choice([" and ", " or "]).join(operands)
+
+
+def random_payload(rng: random.Random) -> dict[str, str]:
+    """
+    This function returns a random payload, with missing parameters and invalid versions.
+    """
+    payload = {
+        "country": rng.choice(COUNTRIES + ["CH"]),
+        "platform": rng.choice(["ios", "android"]),
+        "app_version": rng.choice([random_version(rng), "not a version"]),
+        "os_version": str(rng.randint(9, 15)),
+    }
+    for name in rng.sample(list(payload), rng.randint(0, 2)):
+        del payload[name]
+    return payload
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matching_like_every_condition(seed: int):
+    """
+    AudienceIndex returns the audiences whose compiled condition matches, in order.
+    """
+    rng = random.Random(seed)
+    conditions = [
+        (f"PROPERTY_{i}", AudienceCondition(random_condition(rng)))
+        for i in range(rng.randint(1, 200))
+    ]
+    index = AudienceIndex(conditions)
+
+    for _ in range(200):
+        payload = random_payload(rng)
+        assert index.matching(payload) == [
+            audience_name
+            for audience_name, condition in conditions
+            if condition.matches(payload)
+        ]
+
+
+def test_matching_without_conditions():
+    """
+    An empty index matches no audience.
+    """
+    assert not AudienceIndex([]).matching({"country": "FR"})
@@ -0,0 +1,27 @@
+"""
+This module contains the aiobotocore session shared by async AWS clients.
+"""
+
+import os
+
+from aiobotocore.credentials import AioCredentialResolver, AioEnvProvider
+from aiobotocore.session import AioSession, get_session
+
+
+def __create_session() -> AioSession:
+    """
+    This function returns the session of the container : service models, endpoints and
+    credentials are loaded once for all clients.
+    Lambda provides credentials as environment variables : the default credential chain,
+    which creates instance and container metadata fetchers (an SSL context each) before
+    looking at environment variables, is then replaced by the environment provider.
+    """
+    session = get_session()
+    if os.environ.get(AioEnvProvider.ACCESS_KEY):
+        session.register_component(
+            "credential_provider", AioCredentialResolver([AioEnvProvider()])
+        )
+    return session
+
+
+session = __create_session()
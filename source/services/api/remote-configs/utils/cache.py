@@ -0,0 +1,102 @@
+"""
+This module contains TTLCache class.
+"""
+
+from time import monotonic
+from typing import Any, Awaitable, Callable, Hashable
+
+from utils import tracing
+
+
+class TTLCache:
+    """
+    This class represents an in-memory cache that lives as long as the Lambda container.
+    Each entry is fresh for `ttl_seconds`. Once expired, the entry is revalidated with
+    `version_loader` (if given) and the value is loaded again only if its version changed.
+    It is used by coroutines of the container event loop only : it needs no lock.
+    """
+
+    def __init__(self, ttl_seconds: float, name: str):
+        self.__name = name
+        self.__ttl_seconds = ttl_seconds
+        # key -> (expires_at, version, value)
+        self.__entries: dict[Hashable, tuple[float, Any, Any]] = {}
+        self.__hits = 0
+        self.__misses = 0
+        self.__refreshes = 0
+
+    @property
+    def hits(self) -> int:
+        """
+        This property returns the number of values served without any database read.
+        """
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """
+        This property returns the number of values loaded because they were not cached.
+        """
+        return self.__misses
+
+    @property
+    def refreshes(self) -> int:
+        """
+        This property returns the number of expired values revalidated with their version.
+        """
+        return self.__refreshes
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[..., Awaitable[Any]],
+        version_loader: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Any:
+        """
+        This method returns the value cached for <key>, awaiting <loader> when needed.
+        When <version_loader> is given, <loader> receives the version it loads.
+        """
+        entry = self.__entries.get(key)
+        if entry and monotonic() < entry[0]:
+            self.__hits += 1
+            tracing.record_cache(self.__name, hit=True)
+            return entry[2]
+
+        tracing.record_cache(self.__name, hit=False)
+
+        if entry:
+            self.__refreshes += 1
+        else:
+            self.__misses += 1
+
+        # Version is read BEFORE the value : an update between both reads
+        # only leads to an extra reload on next refresh, never to a stale value.
+        version = await version_loader() if version_loader else None
+        if entry and version_loader and version == entry[1]:
+            value = entry[2]
+        elif version_loader:
+            value = await loader(version)
+        else:
+            value = await loader()
+
+        self.__entries[key] = (monotonic() + self.__ttl_seconds, version, value)
+        return value
+
+    def invalidate(self, key: Hashable | None = None):
+        """
+        This method removes <key> from cache. If <key> is None, the whole cache is cleared.
+        """
+        if key is None:
+            self.__entries.clear()
+        else:
+            self.__entries.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        """
+        This method returns cache counters.
+        """
+        return {
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "refreshes": self.__refreshes,
+        }
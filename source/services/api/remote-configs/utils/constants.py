@@ -8,6 +8,19 @@ import os
 AUDIENCES_TABLE_PROD = os.environ["AUDIENCES_TABLE_PROD"]
 AUDIENCES_TABLE_DEV = os.environ["AUDIENCES_TABLE_DEV"]
 AUDIENCES_TABLE_SANDBOX = os.environ["AUDIENCES_TABLE_SANDBOX"]
+# Item of audiences tables whose audiences_version is increased by the backoffice on
+# every audience change (keep in sync with analytics-backoffice).
+AUDIENCES_VERSION_NAME = "__audiences_version__"
 REMOTE_CONFIGS_TABLE = os.environ["REMOTE_CONFIGS_TABLE"]
+REMOTE_CONFIGS_APPLICATIONS_TABLE = os.environ["REMOTE_CONFIGS_APPLICATIONS_TABLE"]
 USERS_ABTESTS_TABLE = os.environ["USERS_ABTESTS_TABLE"]
 USERS_AUDIENCES_TABLE = os.environ["USERS_AUDIENCES_TABLE"]
+# Published by users-audiences Lambda. An empty key disables it (users-audiences table is queried).
+USERS_AUDIENCES_SNAPSHOT_BUCKET = os.environ["USERS_AUDIENCES_SNAPSHOT_BUCKET"]
+USERS_AUDIENCES_SNAPSHOT_KEY = os.environ["USERS_AUDIENCES_SNAPSHOT_KEY"]
+
+CACHE_TIMEOUT_SECONDS = int(os.environ["CACHE_TIMEOUT_SECONDS"])
+
+# Deterministic ABTests groups are not stored. The audit log prints them to the function
+# logs (one {"abtest_audit": group} JSON line each), the response never waits for it.
+ABTESTS_AUDIT_LOG = os.environ["ABTESTS_AUDIT_LOG"] == "true"
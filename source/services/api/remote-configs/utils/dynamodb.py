@@ -0,0 +1,156 @@
+"""
+This module contains DynamoDB helpers.
+"""
+
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, TYPE_CHECKING
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from utils import tracing
+from utils.aws import session
+
+if TYPE_CHECKING:
+    from types_aiobotocore_dynamodb.client import DynamoDBClient
+
+
+BATCH_GET_ITEM_LIMIT = 100
+BATCH_WRITE_ITEM_LIMIT = 25
+
+__serializer = TypeSerializer()
+__deserializer = TypeDeserializer()
+# Clients (and their connection pools) live as long as the container.
+__clients: dict[str | None, "DynamoDBClient"] = {}
+__clients_stack = AsyncExitStack()
+__clients_lock = asyncio.Lock()
+
+
+async def dynamodb_client(region_name: str | None = None) -> "DynamoDBClient":
+    """
+    This function returns the async DynamoDB client of <region_name> (default region if
+    None), created on first use. Clients are bound to the event loop of the container :
+    every invocation runs on the same one (see main.handler).
+    """
+    if region_name not in __clients:
+        async with __clients_lock:
+            if region_name not in __clients:
+                __clients[region_name] = tracing.trace_boto3(
+                    await __clients_stack.enter_async_context(
+                        session.create_client("dynamodb", region_name=region_name)
+                    )
+                )
+    return __clients[region_name]
+
+
+def serialize(item: dict[str, Any]) -> dict[str, Any]:
+    """
+    This function returns <item> (or key) with DynamoDB typed values (low-level client).
+    """
+    return {name: __serializer.serialize(value) for name, value in item.items()}
+
+
+def deserialize(item: dict[str, Any]) -> dict[str, Any]:
+    """
+    This function returns <item> of low-level client with Python values (as boto3 Table).
+    """
+    return {name: __deserializer.deserialize(value) for name, value in item.items()}
+
+
+async def batch_get_items(
+    dynamodb: "DynamoDBClient", table_name: str, keys: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """
+    This function returns items of <table_name> that match <keys>.
+    Keys are fetched by chunks of 100 (BatchGetItem limit), concurrently, and
+    UnprocessedKeys are retried.
+    """
+
+    async def get_chunk(chunk: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        items = []
+        request_items = {table_name: {"Keys": [serialize(key) for key in chunk]}}
+        retries = 0
+        while request_items:
+            if retries:
+                # Back-off on throttling
+                await asyncio.sleep(min(0.05 * 2**retries, 1))
+            response = await dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(response["Responses"].get(table_name, []))
+            request_items = response.get("UnprocessedKeys")
+            retries += 1
+        return items
+
+    chunks = await asyncio.gather(
+        *(
+            get_chunk(keys[i : i + BATCH_GET_ITEM_LIMIT])
+            for i in range(0, len(keys), BATCH_GET_ITEM_LIMIT)
+        )
+    )
+    return [deserialize(item) for items in chunks for item in items]
+
+
+async def batch_put_items(
+    dynamodb: "DynamoDBClient", table_name: str, items: list[dict[str, Any]]
+):
+    """
+    This function puts <items> into <table_name> by chunks of 25 (BatchWriteItem limit),
+    concurrently, and retries UnprocessedItems.
+    """
+
+    async def put_chunk(chunk: list[dict[str, Any]]):
+        request_items = {
+            table_name: [{"PutRequest": {"Item": serialize(item)}} for item in chunk]
+        }
+        retries = 0
+        while request_items:
+            if retries:
+                # Back-off on throttling
+                await asyncio.sleep(min(0.05 * 2**retries, 1))
+            response = await dynamodb.batch_write_item(RequestItems=request_items)
+            request_items = response.get("UnprocessedItems")
+            retries += 1
+
+    await asyncio.gather(
+        *(
+            put_chunk(items[i : i + BATCH_WRITE_ITEM_LIMIT])
+            for i in range(0, len(items), BATCH_WRITE_ITEM_LIMIT)
+        )
+    )
+
+
+async def get_item(
+    dynamodb: "DynamoDBClient", table_name: str, key: dict[str, Any], projection: str
+) -> dict[str, Any]:
+    """
+    This function returns <projection> attributes of <table_name> item with <key>, or {}.
+    """
+    response = await dynamodb.get_item(
+        TableName=table_name, Key=serialize(key), ProjectionExpression=projection
+    )
+    return deserialize(response.get("Item", {}))
+
+
+async def query_all(dynamodb: "DynamoDBClient", **kwargs: Any) -> list[dict[str, Any]]:
+    """
+    This function returns all items of a query (every page is read).
+    """
+    return await __read_all(dynamodb.query, kwargs)
+
+
+async def scan_all(dynamodb: "DynamoDBClient", **kwargs: Any) -> list[dict[str, Any]]:
+    """
+    This function returns all items of a scan (every page is read).
+    """
+    return await __read_all(dynamodb.scan, kwargs)
+
+
+async def __read_all(operation: Any, kwargs: dict[str, Any]) -> list[dict[str, Any]]:
+    response = await operation(**kwargs)
+    items = response["Items"]
+
+    while "LastEvaluatedKey" in response:
+        response = await operation(
+            ExclusiveStartKey=response["LastEvaluatedKey"], **kwargs
+        )
+        items.extend(response["Items"])
+    return [deserialize(item) for item in items]
@@ -0,0 +1,35 @@
+"""
+This module contains S3 helpers.
+"""
+
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, TYPE_CHECKING
+
+
+from utils import tracing
+from utils.aws import session
+
+if TYPE_CHECKING:
+    from types_aiobotocore_s3.client import S3Client
+
+
+__clients: dict[str, Any] = {}
+__clients_stack = AsyncExitStack()
+__clients_lock = asyncio.Lock()
+
+
+async def s3_client() -> "S3Client":
+    """
+    This function returns the async S3 client of the container, created on first use.
+    It is bound to the event loop of the container, like DynamoDB clients.
+    """
+    if "s3" not in __clients:
+        async with __clients_lock:
+            if "s3" not in __clients:
+                __clients["s3"] = tracing.trace_boto3(
+                    await __clients_stack.enter_async_context(
+                        session.create_client("s3")
+                    )
+                )
+    return __clients["s3"]
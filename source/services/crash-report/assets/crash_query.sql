@@ -29,10 +29,8 @@ FROM (
             ) * 100 AS tx_crash_free_sessions
         FROM raw_events
         WHERE -- Filter records to include only those of the specific application (given in a function's parameter).
-            application_name = '%%APPLICATION_NAME%%' -- Filter records to include only those on the current date.
-            AND date(
-                date_parse(CONCAT(year, '-', month, '-', day), '%Y-%m-%d')
-            ) = current_date -- Filter records to include only those in the last hour.
+            application_name = '%%APPLICATION_NAME%%' -- Filter records to include only partitions of the last hour (explicit values, pruned by Athena).
+            AND (%%PARTITIONS%%) -- Filter records to include only those in the last hour.
             AND from_unixtime(event_timestamp) >= date_add('hour', -1, current_timestamp)
         GROUP BY json_extract_scalar(app_info, '$.app_version')
         HAVING count(
@@ -1,22 +1,25 @@
 """
 This lambda analyses apps every hours.
 """
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import json
-from time import sleep, time
+from time import time
 from typing import Any
 
 import boto3
 import requests
 
-from utils import constants
+from utils import constants, tracing
+from utils.athena import partition_predicate, query_rows, run_queries, succeeded
 
 
-athena = boto3.client("athena")
-dynamodb = boto3.resource("dynamodb")
-secrets_manager = boto3.client("secretsmanager")
+athena = tracing.trace_boto3(boto3.client("athena"))
+dynamodb = tracing.trace_boto3(boto3.resource("dynamodb"))
+s3 = tracing.trace_boto3(boto3.client("s3"))
+secrets_manager = tracing.trace_boto3(boto3.client("secretsmanager"))
 
 
+@tracing.traced_handler
 def handler(event: dict[str, Any], context: dict[str, Any]):
     """
     lambda handler
@@ -29,51 +32,50 @@ def handler(event: dict[str, Any], context: dict[str, Any]):
 
     applications = {}
     crashes_rates: list[dict[str, Any]] = []
-    query_IDs: dict[str, str] = {}
+    queries: dict[str, str] = {}
 
+    # The last hour spans yesterday partition too right after midnight.
+    now = datetime.now(timezone.utc)
     with open("assets/crash_query.sql", encoding="UTF-8") as f:
-        base_query = f.read()
+        base_query = f.read().replace(
+            "%%PARTITIONS%%",
+            partition_predicate((now - timedelta(hours=1)).date(), now.date()),
+        )
 
     dynamodb_response = dynamodb.Table(constants.APPLICATIONS_TABLE).scan()
     for item in dynamodb_response["Items"]:
         application_name = item["application_name"]
         applications[application_name] = item["application_id"]
-        athena_response = athena.start_query_execution(
-            QueryString=base_query.replace("%%APPLICATION_NAME%%", application_name),
-            QueryExecutionContext={"Database": constants.ANALYTICS_DATABASE},
-            ResultConfiguration={
-                "OutputLocation": f"s3://{constants.ANALYTICS_BUCKET}/athena_query_results/"
-            },
+        queries[application_name] = base_query.replace(
+            "%%APPLICATION_NAME%%", application_name
         )
-        query_IDs[application_name] = athena_response["QueryExecutionId"]
-
-    # Waiting for queries to execute
-    for application_name, query_ID in query_IDs.items():
-        __wait_athena_query(application_name, query_ID)
-
-        # Get Athena Query Results
-        query_results = athena.get_query_results(QueryExecutionId=query_ID)
-        result_set = query_results["ResultSet"]
-
-        # Search index for each column
-        for i, column in enumerate(result_set["ResultSetMetadata"]["ColumnInfo"]):
-            match column["Name"]:
-                case "app_version":
-                    app_version_index = i
-                case "rate_impacted_users":
-                    rate_impacted_users_index = i
-                case "rate_crash_free_sessions":
-                    rate_crash_free_sessions_index = i
-
-        for row in result_set["Rows"][1:]:
-            rate_impacted_users = float(
-                row["Data"][rate_impacted_users_index]["VarCharValue"]
-            )
-            rate_crash_free_sessions = float(
-                row["Data"][rate_crash_free_sessions_index]["VarCharValue"]
-            )
+
+    # All applications are analysed concurrently.
+    query_executions = run_queries(
+        athena,
+        queries,
+        constants.ANALYTICS_DATABASE,
+        f"s3://{constants.ANALYTICS_BUCKET}/athena_query_results/",
+    )
+    # Failed applications are reported once others are saved.
+    failed_application_names = [
+        application_name
+        for application_name, query_execution in query_executions.items()
+        if not succeeded(query_execution)
+    ]
+
+    for application_name, query_execution in query_executions.items():
+        if application_name in failed_application_names:
+            continue
+
+        for app_version, impacted_users, crash_free_sessions in query_rows(
+            s3,
+            query_execution,
+            columns=["app_version", "rate_impacted_users", "rate_crash_free_sessions"],
+        ):
+            rate_impacted_users = float(impacted_users)
+            rate_crash_free_sessions = float(crash_free_sessions)
             if rate_crash_free_sessions <= constants.RATE_CRASH_FREE_SESSIONS_THRESHORD:
-                app_version = row["Data"][app_version_index]["VarCharValue"]
                 crash_rate = {
                     "application_name": application_name,
                     "application_id": applications[application_name],
@@ -96,6 +98,11 @@ def handler(event: dict[str, Any], context: dict[str, Any]):
                 }
             )
 
+    if failed_application_names:
+        raise ValueError(
+            f"ERROR with {', '.join(failed_application_names)} application(s)"
+        )
+
 
 def __crash_reported(application_name: str, app_version: str) -> bool:
     response = dynamodb.Table(constants.CRASHES_TABLE).get_item(
@@ -122,47 +129,32 @@ def __slack_message(channel: str, token: str, crash_rate: dict[str, Any]):
     )
     url = f"{base_url}?&name.keyword={bundle_ID}&is_editor=False&tag=%21%3DClosed&version.keyword={app_version}"
 
-    response = requests.post(
-        "https://slack.com/api/chat.postMessage",
-        headers={"Authorization": f"Bearer {token}"},
-        json={
-            "attachments": [
-                {
-                    "title": f"Crash Report Alert - {application_name} {'CHINA' if is_china else ''} - {app_version}",
-                    "text": "\n".join(
-                        [
-                            f"• Impacted Users: {crash_rate['rate_impacted_users']}%",
-                            f"• Crash Free Sessions: {crash_rate['rate_crash_free_sessions']}%",
-                            f"<{url}|View Crash Report>",
-                            "This report will be re-evaluated in 24 hours.",
-                        ]
-                    ),
-                    "color": "#FF0000",
-                    "footer": datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
-                }
-            ],
-            "channel": channel,
-            "icon_emoji": ":hugofirefighter:",
-            "username": "Hugo le pompier",
-        },
-        timeout=60,
-    )
+    with tracing.trace("slack.PostMessage"):
+        response = requests.post(
+            "https://slack.com/api/chat.postMessage",
+            headers={"Authorization": f"Bearer {token}"},
+            json={
+                "attachments": [
+                    {
+                        "title": f"Crash Report Alert - {application_name} {'CHINA' if is_china else ''} - {app_version}",
+                        "text": "\n".join(
+                            [
+                                f"• Impacted Users: {crash_rate['rate_impacted_users']}%",
+                                f"• Crash Free Sessions: {crash_rate['rate_crash_free_sessions']}%",
+                                f"<{url}|View Crash Report>",
+                                "This report will be re-evaluated in 24 hours.",
+                            ]
+                        ),
+                        "color": "#FF0000",
+                        "footer": datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
+                    }
+                ],
+                "channel": channel,
+                "icon_emoji": ":hugofirefighter:",
+                "username": "Hugo le pompier",
+            },
+            timeout=60,
+        )
     response_data = response.json()
     if not response_data["ok"]:
         raise ValueError(f"Error during Slack process : {response_data['error']}")
-
-
-def __wait_athena_query(application_name: str, query_ID: str):
-    print(f"Waiting {query_ID} query for {application_name} application...")
-    while True:
-        sleep(0.5)  # To avoid spamming requests
-        query_status = athena.get_query_execution(QueryExecutionId=query_ID)[
-            "QueryExecution"
-        ]["Status"]
-        if query_status["State"] not in ("QUEUED", "RUNNING"):
-            break
-
-    if query_status["State"] == "FAILED":
-        raise ValueError(
-            f"ERROR with {application_name} application : {query_status['StateChangeReason']}"
-        )
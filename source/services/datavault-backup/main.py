@@ -11,10 +11,13 @@ from typing import Any
 import boto3
 import redshift_connector
 
+from utils import tracing
 
-secrets_manager = boto3.client("secretsmanager")
 
+secrets_manager = tracing.trace_boto3(boto3.client("secretsmanager"))
 
+
+@tracing.traced_handler
 def handler(event: dict[str, Any], context: dict[str, Any]):
     """
     lambda handler
@@ -32,13 +35,14 @@ def handler(event: dict[str, Any], context: dict[str, Any]):
     ACCESS_KEY_ID = datavault_secrets["ACCESS_KEY_ID"]
     SECRET_ACCESS_KEY = datavault_secrets["SECRET_ACCESS_KEY"]
 
-    connection = redshift_connector.connect(
-        host=datavault_secrets["HOST"],
-        database=datavault_secrets["DATABASE"],
-        port=5439,
-        user=datavault_secrets["USER"],
-        password=datavault_secrets["PASSWORD"],
-    )
+    with tracing.trace("redshift.Connect"):
+        connection = redshift_connector.connect(
+            host=datavault_secrets["HOST"],
+            database=datavault_secrets["DATABASE"],
+            port=5439,
+            user=datavault_secrets["USER"],
+            password=datavault_secrets["PASSWORD"],
+        )
     cursor = connection.cursor()
 
     with open("assets/datavault_config.json", encoding="UTF-8") as f:
@@ -85,7 +89,8 @@ def handler(event: dict[str, Any], context: dict[str, Any]):
         if partitionned:
             UNLOAD_QUERY += "\nPARTITION BY (year, month, day)"
 
-        cursor.execute(UNLOAD_QUERY)
+        with tracing.trace("redshift.Unload"):
+            cursor.execute(UNLOAD_QUERY)
 
 
 if __name__ == "__main__":
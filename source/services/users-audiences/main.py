@@ -1,95 +1,809 @@
 """
 This module lambda assigns audiences to users.
 """
-from collections import defaultdict
-from datetime import datetime, timedelta
-from time import sleep, time
-from typing import Any
+from array import array
+import calendar
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+import json
+import math
+import threading
+from time import monotonic, time
+from typing import Any, Iterable, Iterator
+from uuid import uuid4
 
 import boto3
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 
-from utils import constants
+from utils import checkpoint, constants, snapshot, tracing, watermarks
+from utils.athena import (
+    partition_predicate,
+    query_rows,
+    start_queries,
+    succeeded,
+    wait_queries,
+)
+from utils.dynamodb import PARALLELISM, batch_write, parallel_scan
 
 
-athena = boto3.client("athena")
-dynamodb = boto3.resource("dynamodb")
+athena = tracing.trace_boto3(boto3.client("athena"))
+dynamodb = tracing.trace_boto3(boto3.resource("dynamodb"))
+lambda_client = tracing.trace_boto3(boto3.client("lambda"))
+s3 = tracing.trace_boto3(boto3.client("s3"))
+scheduler = tracing.trace_boto3(boto3.client("scheduler"))
 
+# A user is in an audience while they have an event of the last WINDOW_DAYS days
+# (and today), then for MEMBERSHIP_DAYS days.
+WINDOW_DAYS = 7
+MEMBERSHIP_DAYS = 30
 
+# An invocation stops this long before its timeout : the next one continues the run.
+REMAINING_TIME_MARGIN_SECONDS = 60
+# Progress of query results writes is saved every WRITE_CHUNK_ROWS rows.
+WRITE_CHUNK_ROWS = 10000
+# Writes of a query (or a publication) whose progress did not move for this long are
+# taken over by another invocation. A run waiting for other invocations schedules its
+# resume (RESUME_SCHEDULE) once they would be stalled, not to wait the next daily run.
+STALLED_SECONDS = 30 * 60
+RESUME_SCHEDULE = "resume"
+# Partial snapshots of writers downloaded concurrently by the publication.
+PARTIALS_DOWNLOADS = 8
+
+
+@tracing.traced_handler
 def handler(event: dict[str, Any], context: dict[str, Any]):
     """
     lambda handler
+    A run is resumable : its state is saved in a checkpoint, and an invocation running
+    out of time invokes the function again to continue it. Results of each query are
+    written by their own invocation ({"query": name}), in parallel. Invocations of the
+    function by itself ({"resume": true}) never start a new run. A run waiting for
+    other invocations is resumed by a one-shot schedule if they stall.
     """
     print("Assigning audiences to users.")
     print(f"Event: {event}")
     print(f"Context: {context}")
 
-    dates = [datetime.now() - timedelta(days=i + 1) for i in range(7)]
+    deadline = (
+        monotonic() + __remaining_seconds(context) - REMAINING_TIME_MARGIN_SECONDS
+    )
+    run = checkpoint.download(
+        s3,
+        constants.ANALYTICS_BUCKET,
+        checkpoint.run_key(constants.USERS_AUDIENCES_CHECKPOINT_PREFIX),
+    )
+
+    if "query" in event:
+        if not run:
+            print("Run is already published.")
+        elif __write_query_results(run, event["query"], deadline):
+            # Back to the run : it is published once all results are written.
+            __invoke({"resume": True})
+        else:
+            __invoke(event)
+        return
 
-    query_IDs = defaultdict(list)
-    users_audiences: list[
-        tuple[str, str]
-    ] = []  # tuple[0] == uid, tuple[1] == audience_name
+    if run:
+        print(f"Resuming run of {run['date']}...")
+    elif event.get("resume"):
+        print("No run to resume.")
+        return
+    else:
+        run = __start_run()
 
-    dynamodb_response = dynamodb.Table(constants.AUDIENCES_TABLE).query(
+    if not __wait_queries(run, deadline):
+        __invoke({"resume": True})
+        return
+    if not __dispatch_writes(run):
+        return
+
+    # Every writer resumes the run once it is done : only one invocation publishes it.
+    # The publisher passes its token to the invocations continuing the publication.
+    publisher = event.get("publisher") or str(uuid4())
+    if not __claim_publication(run, publisher):
+        print("Run is published by another invocation.")
+        __schedule_resume(int(time()) + STALLED_SECONDS)
+    elif not __publish(run, deadline):
+        __invoke({"resume": True, "publisher": publisher})
+
+
+def __start_run() -> dict[str, Any]:
+    """
+    This function starts queries of a new run and returns its checkpoint.
+    """
+    print("Starting a new run...")
+    # Every page is read : an audience missing here would be considered as deleted.
+    audiences_table = dynamodb.Table(constants.AUDIENCES_TABLE)
+    dynamodb_response = audiences_table.query(
         IndexName="type-index", KeyConditionExpression=Key("type").eq("event_based")
     )
-    for audience in dynamodb_response["Items"]:
-        for date in dates:
-            athena_response = athena.start_query_execution(
-                QueryString=f"""
-                    SELECT json_extract_scalar(user, '$.user_id')
-                    FROM {constants.ANALYTICS_TABLE}
-                    WHERE ({audience['condition']})
-                        AND year>='{date.year}'
-                        AND month>='{str(date.month).zfill(2)}'
-                        AND day>='{str(date.day).zfill(2)}'
-                """,
-                QueryExecutionContext={"Database": constants.ANALYTICS_DATABASE},
-                ResultConfiguration={
-                    "OutputLocation": f"s3://{constants.ANALYTICS_BUCKET}/athena_query_results/"
+    items = dynamodb_response["Items"]
+    while "LastEvaluatedKey" in dynamodb_response:
+        dynamodb_response = audiences_table.query(
+            IndexName="type-index",
+            KeyConditionExpression=Key("type").eq("event_based"),
+            ExclusiveStartKey=dynamodb_response["LastEvaluatedKey"],
+        )
+        items.extend(dynamodb_response["Items"])
+    audiences = {item["audience_name"]: item["condition"] for item in items}
+
+    # Only partitions added since the watermark of each audience are scanned (and the
+    # partition of the watermark, which was not complete). Audiences with the same
+    # first partition are evaluated by the same scan.
+    today = date.today()
+    window_start = today - timedelta(days=WINDOW_DAYS)
+    audiences_watermarks = watermarks.download(
+        s3, constants.ANALYTICS_BUCKET, constants.USERS_AUDIENCES_WATERMARKS_KEY
+    )
+    audience_names_by_start_date: dict[date, list[str]] = defaultdict(list)
+    for audience_name, condition in audiences.items():
+        audience_names_by_start_date[
+            watermarks.start_date(
+                audiences_watermarks, audience_name, condition, window_start
+            )
+        ].append(audience_name)
+
+    run = {
+        "date": today.isoformat(),
+        "started": int(time()),
+        "audiences": audiences,
+        "queries": {},
+    }
+    __start_queries(
+        run,
+        {
+            f"audiences since {start_date}": (start_date, audience_names)
+            for start_date, audience_names in audience_names_by_start_date.items()
+        },
+    )
+    return run
+
+
+def __start_queries(
+    run: dict[str, Any],
+    queries: dict[str, tuple[date, list[str]]],
+    **fields: Any,
+):
+    """
+    This function starts <queries> (name -> (start_date, audience_names)) and saves their
+    query IDs in <run> checkpoint : a following invocation waits the same queries.
+    """
+    query_IDs = start_queries(
+        athena,
+        {
+            name: __audiences_query(
+                {
+                    audience_name: run["audiences"][audience_name]
+                    for audience_name in audience_names
                 },
+                start_date,
+                date.fromisoformat(run["date"]),
             )
-            query_IDs[audience["audience_name"]].append(
-                athena_response["QueryExecutionId"]
+            for name, (start_date, audience_names) in queries.items()
+        },
+        constants.ANALYTICS_DATABASE,
+        f"s3://{constants.ANALYTICS_BUCKET}/athena_query_results/",
+        constants.ATHENA_RESULTS_MAX_AGE_MINUTES,
+    )
+    for name, query_ID in query_IDs.items():
+        start_date, audience_names = queries[name]
+        run["queries"][name] = {
+            "query_ID": query_ID,
+            "start_date": start_date.isoformat(),
+            "audience_names": audience_names,
+            **fields,
+        }
+    __save_run(run)
+
+
+def __wait_queries(run: dict[str, Any], deadline: float) -> bool:
+    """
+    This function waits queries of <run> until <deadline>, and returns True once all
+    queries are done.
+    """
+    while True:
+        running = {
+            name: query["query_ID"]
+            for name, query in run["queries"].items()
+            if "query_execution" not in query
+        }
+        if running:
+            query_executions = wait_queries(
+                athena, running, max(deadline - monotonic(), 0)
             )
+            for name, query_execution in query_executions.items():
+                # Only what following stages read is saved (JSON serializable).
+                run["queries"][name]["query_execution"] = {
+                    "QueryExecutionId": query_execution["QueryExecutionId"],
+                    "ResultConfiguration": {
+                        "OutputLocation": query_execution["ResultConfiguration"][
+                            "OutputLocation"
+                        ]
+                    },
+                    "Status": {"State": query_execution["Status"]["State"]},
+                }
+            __save_run(run)
+            if len(query_executions) < len(running):
+                return False
 
-    # Waiting for queries to execute
-    for audience_name, queries in query_IDs.items():
-        uids = set()
-        for query_ID in queries:
-            print(f"Waiting {query_ID} query for {audience_name} audience...")
-            while True:
-                sleep(0.5)  # To avoid spamming requests
-                query_status = athena.get_query_execution(QueryExecutionId=query_ID)[
-                    "QueryExecution"
-                ]["Status"]
-                if query_status["State"] not in ("QUEUED", "RUNNING"):
-                    break
-
-            if query_status["State"] == "FAILED":
-                print(
-                    f"ERROR with {audience_name} audience : {query_status['StateChangeReason']}"
-                )
+        # An invalid condition fails the whole query : audiences of failed queries are
+        # evaluated one by one so that only invalid ones are skipped.
+        single_queries: dict[str, tuple[date, list[str]]] = {}
+        for query in run["queries"].values():
+            if succeeded(query["query_execution"]) or query.get("retried"):
                 continue
+            query["retried"] = True
+            for audience_name in query["audience_names"]:
+                single_queries[f"audience {audience_name}"] = (
+                    date.fromisoformat(query["start_date"]),
+                    [audience_name],
+                )
+        if not single_queries:
+            return True
+        __start_queries(run, single_queries, retried=True)
+
+
+def __dispatch_writes(run: dict[str, Any]) -> bool:
+    """
+    This function invokes a writer for each query whose results are not written yet,
+    and returns True once all results are written. Otherwise, the run is resumed once
+    the first pending writer would be stalled.
+    """
+    pending = {}
+    for name, query in run["queries"].items():
+        if succeeded(query["query_execution"]):
+            progress = checkpoint.download(
+                s3,
+                constants.ANALYTICS_BUCKET,
+                checkpoint.progress_key(
+                    constants.USERS_AUDIENCES_CHECKPOINT_PREFIX, name
+                ),
+            )
+            if not progress.get("done"):
+                pending[name] = progress
+    if not pending:
+        return True
+
+    now = int(time())
+    for name, progress in pending.items():
+        # A writer in progress is left alone, unless it stopped without any error.
+        if progress and now - progress["updated"] < STALLED_SECONDS:
+            continue
+        progress = {"rows": progress.get("rows", 0), "done": False, "updated": now}
+        pending[name] = progress
+        checkpoint.upload(
+            s3,
+            constants.ANALYTICS_BUCKET,
+            checkpoint.progress_key(constants.USERS_AUDIENCES_CHECKPOINT_PREFIX, name),
+            progress,
+        )
+        __invoke({"query": name})
+    print(f"Waiting results writes of {len(pending)} queries...")
+    __schedule_resume(
+        min(progress["updated"] for progress in pending.values()) + STALLED_SECONDS
+    )
+    return False
+
+
+def __write_query_results(run: dict[str, Any], name: str, deadline: float) -> bool:
+    """
+    This function writes changed memberships of query <name> results from its progress
+    until <deadline>, and returns True once all its results are written.
+    Rows are written by chunks of WRITE_CHUNK_ROWS with their partial snapshot, then
+    progress is saved.
+    """
+    progress_key = checkpoint.progress_key(
+        constants.USERS_AUDIENCES_CHECKPOINT_PREFIX, name
+    )
+    progress = checkpoint.download(s3, constants.ANALYTICS_BUCKET, progress_key)
+    if progress.get("done"):
+        return True
+
+    previous_memberships = __previous_memberships()
+    written_rows = progress.get("rows", 0)
+    print(f"Writing {name} results from row {written_rows}...")
+
+    write_requests: list[dict[str, Any]] = []
+    found = __found()
+    changes: Counter[str] = Counter()
+    row = written_rows
+    for row, (uid, audience_name, expires_timestamp) in enumerate(
+        __query_rows(run["queries"][name]["query_execution"]), 1
+    ):
+        if row <= written_rows:
+            continue
+
+        uid_hash = snapshot.uid_hash(uid)
+        change, expires_timestamp = __membership(
+            previous_memberships,
+            uid_hash,
+            audience_name,
+            expires_timestamp,
+            run["started"],
+        )
+        uid_hashes, expires = found[audience_name]
+        uid_hashes.append(uid_hash)
+        expires.append(expires_timestamp)
+        changes[change] += 1
+        if change != "unchanged":
+            write_requests.append(
+                {
+                    "PutRequest": {
+                        "Item": {
+                            "uid": {"S": uid},
+                            "audience_name": {"S": audience_name},
+                            "expires_timestamp": {"N": str(expires_timestamp)},
+                        }
+                    }
+                }
+            )
+
+        if row % WRITE_CHUNK_ROWS == 0:
+            __save_chunk(run, name, row, write_requests, found)
+            write_requests = []
+            found = __found()
+            checkpoint.upload(
+                s3,
+                constants.ANALYTICS_BUCKET,
+                progress_key,
+                {"rows": row, "done": False, "updated": int(time())},
+            )
+            if monotonic() >= deadline:
+                print(f"{row} rows of {name} written {dict(changes)}, to be continued")
+                return False
+
+    __save_chunk(run, name, row, write_requests, found)
+    checkpoint.upload(
+        s3,
+        constants.ANALYTICS_BUCKET,
+        progress_key,
+        {"rows": row, "done": True, "updated": int(time())},
+    )
+    print(f"{row} rows of {name} written {dict(changes)}")
+    return True
+
+
+def __save_chunk(
+    run: dict[str, Any],
+    name: str,
+    row: int,
+    write_requests: list[dict[str, Any]],
+    found: dict[str, tuple[array, array]],
+):
+    """
+    This function writes changed memberships of query <name> results chunk ending at
+    <row>, and saves memberships <found> by this chunk as a partial snapshot.
+    """
+    batch_write(dynamodb.meta.client, constants.USERS_AUDIENCES_TABLE, write_requests)
+    if found:
+        snapshot.upload(
+            s3,
+            constants.ANALYTICS_BUCKET,
+            checkpoint.partial_key(
+                constants.USERS_AUDIENCES_CHECKPOINT_PREFIX, name, row
+            ),
+            {
+                audience_name: snapshot.members(zip(uid_hashes, expires))
+                for audience_name, (uid_hashes, expires) in found.items()
+            },
+            version=run["started"],
+        )
+
+
+def __claim_publication(run: dict[str, Any], publisher: str) -> bool:
+    """
+    This function claims the publication of <run> for <publisher>, and returns False
+    if another publisher holds it. The claim is a checkpoint object replaced only if it
+    did not change since it was read : it is taken over once it did not move for
+    STALLED_SECONDS (publisher failed), never once the run is published.
+    """
+    claim_key = checkpoint.claim_key(constants.USERS_AUDIENCES_CHECKPOINT_PREFIX)
+    claim, etag = checkpoint.download_versioned(
+        s3, constants.ANALYTICS_BUCKET, claim_key
+    )
+    now = int(time())
+    if (
+        claim.get("started", 0) >= run["started"]
+        and claim.get("publisher") != publisher
+        and (claim.get("published") or now - claim["updated"] <= STALLED_SECONDS)
+    ):
+        return False
+    return checkpoint.upload_if_unchanged(
+        s3,
+        constants.ANALYTICS_BUCKET,
+        claim_key,
+        {"started": run["started"], "publisher": publisher, "updated": now},
+        etag,
+    )
+
+
+def __publish(run: dict[str, Any], deadline: float) -> bool:
+    """
+    This function publishes users audiences snapshot and watermarks of <run>, and
+    deletes its checkpoint, and returns True once done. Until <deadline>, stages are :
+    merge previous memberships with partial snapshots of writers, remove memberships
+    which are over (scan by segments), publish. Progress is saved after each stage.
+    """
+    prefix = constants.USERS_AUDIENCES_CHECKPOINT_PREFIX
+    publication = checkpoint.download(
+        s3, constants.ANALYTICS_BUCKET, checkpoint.publication_key(prefix)
+    )
+    audiences = run["audiences"]
+    audiences_watermarks = watermarks.download(
+        s3, constants.ANALYTICS_BUCKET, constants.USERS_AUDIENCES_WATERMARKS_KEY
+    )
+    # Users audiences snapshot is the state of users-audiences table (it is published
+    # once the table is written) : unchanged memberships were not written again.
+    previous_memberships = __previous_memberships()
+    computed_audience_names = [
+        audience_name
+        for query in run["queries"].values()
+        if succeeded(query["query_execution"])
+        for audience_name in query["audience_names"]
+    ]
+    reset_audience_names = __reset_audience_names(
+        audiences,
+        audiences_watermarks,
+        previous_memberships.keys(),
+        computed_audience_names,
+    )
+
+    memberships: dict[str, snapshot.Members] | None = None
+    if not publication.get("merged"):
+        print("Merging users audiences snapshot...")
+        memberships = __merge(run, previous_memberships, reset_audience_names)
+        snapshot.upload(
+            s3,
+            constants.ANALYTICS_BUCKET,
+            checkpoint.staged_snapshot_key(prefix),
+            memberships,
+            version=run["started"],
+        )
+        publication = {"merged": True, "segments": {}}
+        __save_publication(publication)
+    del previous_memberships
+
+    if reset_audience_names and not __scanned(publication["segments"]):
+        if monotonic() >= deadline:
+            return False
+        print(f"Removing memberships of {sorted(reset_audience_names)}...")
+        if memberships is None:
+            memberships = snapshot.download(
+                s3, constants.ANALYTICS_BUCKET, checkpoint.staged_snapshot_key(prefix)
+            )
+        publication["segments"] = __remove_memberships(
+            memberships, reset_audience_names, publication["segments"], deadline
+        )
+        __save_publication(publication)
+        if not __scanned(publication["segments"]):
+            print("Removals to be continued")
+            return False
+
+    print("Publishing users audiences snapshot...")
+    s3.copy_object(
+        Bucket=constants.ANALYTICS_BUCKET,
+        Key=constants.USERS_AUDIENCES_SNAPSHOT_KEY,
+        CopySource={
+            "Bucket": constants.ANALYTICS_BUCKET,
+            "Key": checkpoint.staged_snapshot_key(prefix),
+        },
+    )
 
-            # Get Athena Query Results
-            query_results = athena.get_query_results(QueryExecutionId=query_ID)
-            result_set = query_results["ResultSet"]
+    # Watermarks are moved once memberships are saved : a failed run is scanned again.
+    watermarks.upload(
+        s3,
+        constants.ANALYTICS_BUCKET,
+        constants.USERS_AUDIENCES_WATERMARKS_KEY,
+        {
+            audience_name: watermark
+            for audience_name, watermark in audiences_watermarks.items()
+            if audience_name in audiences
+        }
+        | {
+            audience_name: {
+                "date": run["date"],
+                "condition": watermarks.condition_hash(audiences[audience_name]),
+            }
+            for audience_name in computed_audience_names
+        },
+    )
+
+    # Invocations still resuming this run can not claim it anymore.
+    checkpoint.upload(
+        s3,
+        constants.ANALYTICS_BUCKET,
+        checkpoint.claim_key(prefix),
+        {"started": run["started"], "published": True, "updated": int(time())},
+    )
+    checkpoint.delete(s3, constants.ANALYTICS_BUCKET, prefix)
+    return True
+
+
+def __merge(
+    run: dict[str, Any],
+    previous_memberships: dict[str, snapshot.Members],
+    reset_audience_names: set[str],
+) -> dict[str, snapshot.Members]:
+    """
+    This function returns memberships of <run> : previous memberships (except those
+    of <reset_audience_names>) merged with partial snapshots saved by writers.
+    Memberships which were over when the run started are dropped.
+    """
+    partial_keys = checkpoint.keys(
+        s3,
+        constants.ANALYTICS_BUCKET,
+        checkpoint.partials_prefix(constants.USERS_AUDIENCES_CHECKPOINT_PREFIX),
+    )
+    with ThreadPoolExecutor(max_workers=PARTIALS_DOWNLOADS) as executor:
+        partials = list(
+            executor.map(
+                lambda key: snapshot.download(s3, constants.ANALYTICS_BUCKET, key),
+                partial_keys,
+            )
+        )
 
-            for row in result_set["Rows"][1:]:
-                uids.add(row["Data"][0]["VarCharValue"])
+    members_lists: dict[str, list[snapshot.Members]] = defaultdict(list)
+    for audience_name, members in previous_memberships.items():
+        if audience_name not in reset_audience_names:
+            members_lists[audience_name].append(members)
+    for partial in partials:
+        for audience_name, members in partial.items():
+            members_lists[audience_name].append(members)
+    del partials
 
-        users_audiences.extend((uid, audience_name) for uid in uids)
+    return {
+        audience_name: snapshot.merge(members_list, after=run["started"])
+        for audience_name, members_list in members_lists.items()
+    }
 
-    print(f"Filling the {constants.USERS_AUDIENCES_TABLE} table in progress...")
-    expires_timestamp = int(time()) + (60 * 60 * 24 * 30)  # 30 days
-    with dynamodb.Table(constants.USERS_AUDIENCES_TABLE).batch_writer() as batch:
-        for uid, audience_name in users_audiences:
-            batch.put_item(
-                Item={
-                    "uid": uid,
-                    "audience_name": audience_name,
-                    "expires_timestamp": expires_timestamp,
+
+def __remove_memberships(
+    memberships: dict[str, snapshot.Members],
+    reset_audience_names: set[str],
+    segments: dict[str, Any],
+    deadline: float,
+) -> dict[str, Any]:
+    """
+    This function deletes users-audiences items of <reset_audience_names> which are not
+    in <memberships>, scanning the table from <segments> progress until <deadline>.
+    It returns the scan progress.
+    """
+    removals: Counter[str] = Counter()
+    lock = threading.Lock()
+
+    def remove(items: list[dict[str, Any]]):
+        delete_requests = [
+            {
+                "DeleteRequest": {
+                    "Key": {"uid": item["uid"], "audience_name": item["audience_name"]}
                 }
+            }
+            for item in items
+            if (name := item["audience_name"]["S"]) in reset_audience_names
+            and (
+                name not in memberships
+                or snapshot.expires(
+                    memberships[name], snapshot.uid_hash(item["uid"]["S"])
+                )
+                is None
             )
+        ]
+        batch_write(
+            dynamodb.meta.client, constants.USERS_AUDIENCES_TABLE, delete_requests
+        )
+        with lock:
+            removals["removals"] += len(delete_requests)
+
+    # users-audiences table has no index by audience : it is scanned (rare).
+    # IN accepts up to 100 values : beyond, items are filtered here.
+    scan_filter = (
+        {
+            "FilterExpression": "audience_name IN ("
+            + ", ".join(f":a{i}" for i in range(len(reset_audience_names)))
+            + ")",
+            "ExpressionAttributeValues": {
+                f":a{i}": {"S": audience_name}
+                for i, audience_name in enumerate(sorted(reset_audience_names))
+            },
+        }
+        if len(reset_audience_names) <= 100
+        else {}
+    )
+    segments = parallel_scan(
+        dynamodb.meta.client,
+        constants.USERS_AUDIENCES_TABLE,
+        remove,
+        segments,
+        deadline,
+        ProjectionExpression="uid, audience_name",
+        **scan_filter,
+    )
+    print(f"{constants.USERS_AUDIENCES_TABLE} table changes : {dict(removals)}")
+    return segments
+
+
+def __audiences_query(
+    audiences: dict[str, str], start_date: date, end_date: date
+) -> str:
+    """
+    This function returns a query of (uid, audience_name, last event date) of <audiences>
+    (audience_name -> condition) over partitions from <start_date> to <end_date>.
+    Each audience condition is a labelled predicate : a single scan of events evaluates
+    all audiences.
+    """
+    labelled_predicates = ",\n".join(
+        f"IF(({condition}), {__sql_string(audience_name)})"
+        for audience_name, condition in audiences.items()
+    )
+    return f"""
+        SELECT json_extract_scalar(user, '$.user_id'), audience_name,
+            max(concat(year, '-', month, '-', day))
+        FROM {constants.ANALYTICS_TABLE}
+        CROSS JOIN UNNEST(
+            filter(ARRAY[{labelled_predicates}], name -> name IS NOT NULL)
+        ) AS audiences (audience_name)
+        WHERE ({partition_predicate(start_date, end_date)})
+        GROUP BY 1, 2
+    """
+
+
+@lru_cache
+def __expires_timestamp(last_event_date: str) -> int:
+    """
+    This function returns when a membership expires : it lasts as long as its last event
+    is in the window, then MEMBERSHIP_DAYS.
+    """
+    expires_date = date.fromisoformat(last_event_date) + timedelta(
+        days=WINDOW_DAYS + MEMBERSHIP_DAYS
+    )
+    return calendar.timegm(expires_date.timetuple())
+
+
+def __query_rows(query_execution: dict[str, Any]) -> Iterator[tuple[str, str, int]]:
+    """
+    This function yields (uid, audience_name, expires_timestamp) rows of
+    <query_execution> results.
+    """
+    for uid, audience_name, last_event_date in query_rows(s3, query_execution):
+        if uid and audience_name:
+            yield uid, audience_name, __expires_timestamp(last_event_date)
+
+
+def __invoke(event: dict[str, Any]):
+    """
+    This function invokes this lambda again (asynchronously) with <event>.
+    """
+    print(f"Invoking {constants.FUNCTION_NAME} with {event}")
+    lambda_client.invoke(
+        FunctionName=constants.FUNCTION_NAME,
+        InvocationType="Event",
+        Payload=json.dumps(event).encode(),
+    )
+
+
+def __schedule_resume(timestamp: int):
+    """
+    This function schedules an invocation of this lambda with {"resume": true} at
+    <timestamp> (replacing the previous schedule). The schedule is deleted once done, and
+    it is harmless if the run is published before.
+    """
+    at = datetime.fromtimestamp(max(timestamp, int(time()) + 60), timezone.utc)
+    print(f"Scheduling resume at {at.isoformat()}")
+    schedule = {
+        "Name": RESUME_SCHEDULE,
+        "GroupName": constants.RESUME_SCHEDULE_GROUP,
+        "ScheduleExpression": f"at({at.strftime('%Y-%m-%dT%H:%M:%S')})",
+        "FlexibleTimeWindow": {"Mode": "OFF"},
+        "Target": {
+            "Arn": constants.FUNCTION_ARN,
+            "RoleArn": constants.RESUME_SCHEDULER_ROLE_ARN,
+            "Input": json.dumps({"resume": True}),
+        },
+        "ActionAfterCompletion": "DELETE",
+    }
+    try:
+        scheduler.create_schedule(**schedule)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConflictException":
+            raise
+        scheduler.update_schedule(**schedule)
+
+
+def __membership(
+    previous_memberships: dict[str, snapshot.Members],
+    uid_hash: int,
+    audience_name: str,
+    expires_timestamp: int,
+    started: int,
+) -> tuple[str, int]:
+    """
+    This function returns (change, expires timestamp) of a membership found by a query :
+    change is "inserts", "refreshes" or "unchanged" (it is not written again).
+    Previous memberships over when the run <started> are not taken into account.
+    """
+    previous_expires = (
+        snapshot.expires(previous_memberships[audience_name], uid_hash)
+        if audience_name in previous_memberships
+        else None
+    )
+    if previous_expires is None or previous_expires <= started:
+        return "inserts", expires_timestamp
+    if previous_expires >= expires_timestamp:
+        return "unchanged", previous_expires
+    return "refreshes", expires_timestamp
+
+
+def __previous_memberships() -> dict[str, snapshot.Members]:
+    """
+    This function returns memberships of the published snapshot. The snapshot is only
+    published at the end of a run : every invocation of a run reads the same one.
+    """
+    return snapshot.download(
+        s3, constants.ANALYTICS_BUCKET, constants.USERS_AUDIENCES_SNAPSHOT_KEY
+    )
+
+
+def __found() -> dict[str, tuple[array, array]]:
+    # audience_name -> (uid hashes, expires timestamps) of memberships found by queries.
+    return defaultdict(lambda: (array("Q"), array("I")))
+
+
+def __remaining_seconds(context: Any) -> float:
+    # Lambda context, but not a plain dict (local invocations).
+    if hasattr(context, "get_remaining_time_in_millis"):
+        return context.get_remaining_time_in_millis() / 1000
+    return math.inf
+
+
+def __reset_audience_names(
+    audiences: dict[str, str],
+    audiences_watermarks: dict[str, dict[str, str]],
+    published_audience_names: Iterable[str],
+    computed_audience_names: list[str],
+) -> set[str]:
+    """
+    This function returns names of audiences whose members are removed : deleted
+    audiences, and audiences computed again with a new condition.
+    """
+    return {
+        audience_name
+        for audience_name in audiences_watermarks.keys() | set(published_audience_names)
+        if audience_name not in audiences
+        or (
+            audience_name in computed_audience_names
+            and audience_name in audiences_watermarks
+            and audiences_watermarks[audience_name]["condition"]
+            != watermarks.condition_hash(audiences[audience_name])
+        )
+    }
+
+
+def __save_publication(publication: dict[str, Any]):
+    checkpoint.upload(
+        s3,
+        constants.ANALYTICS_BUCKET,
+        checkpoint.publication_key(constants.USERS_AUDIENCES_CHECKPOINT_PREFIX),
+        publication,
+    )
+
+
+def __save_run(run: dict[str, Any]):
+    checkpoint.upload(
+        s3,
+        constants.ANALYTICS_BUCKET,
+        checkpoint.run_key(constants.USERS_AUDIENCES_CHECKPOINT_PREFIX),
+        run,
+    )
+
+
+def __scanned(segments: dict[str, Any]) -> bool:
+    return len(segments) == PARALLELISM.segments and all(
+        start_key is None for start_key in segments.values()
+    )
+
+
+def __sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
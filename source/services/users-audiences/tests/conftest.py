@@ -0,0 +1,24 @@
+"""
+Unit tests of users-audiences Lambda. Run them from users-audiences directory :
+`python -m pytest tests` (tests are not deployed).
+"""
+import os
+
+
+# Lambda environment, required before importing Lambda modules.
+for variable, value in {
+    "ANALYTICS_BUCKET": "test-analyticsbucket",
+    "ANALYTICS_DATABASE": "test-database",
+    "ANALYTICS_TABLE": "raw_events",
+    "AUDIENCES_TABLE": "test-audiences",
+    "AWS_DEFAULT_REGION": "eu-west-1",
+    "AWS_LAMBDA_FUNCTION_NAME": "test-UsersAudiencesFunction",
+    "FUNCTION_ARN": "arn:aws:lambda:eu-west-1:123456789012:function:test-UsersAudiencesFunction",
+    "RESUME_SCHEDULE_GROUP": "test-users-audiences",
+    "RESUME_SCHEDULER_ROLE_ARN": "arn:aws:iam::123456789012:role/test-UsersAudiencesSchedulerRole",
+    "USERS_AUDIENCES_TABLE": "test-users-audiences",
+    "USERS_AUDIENCES_CHECKPOINT_PREFIX": "users_audiences/checkpoint/",
+    "USERS_AUDIENCES_SNAPSHOT_KEY": "users_audiences/snapshot.bin",
+    "USERS_AUDIENCES_WATERMARKS_KEY": "users_audiences/watermarks.json",
+}.items():
+    os.environ.setdefault(variable, value)
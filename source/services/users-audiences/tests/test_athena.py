@@ -0,0 +1,78 @@
+"""
+Tests of Athena helpers (utils/athena.py is the same in every Lambda querying Athena).
+"""
+from datetime import date
+
+from utils.athena import normalize, partition_predicate, partitions
+
+
+def test_partition_predicate_one_day():
+    """
+    A single day is a single partition.
+    """
+    assert (
+        partition_predicate(date(2026, 10, 17), date(2026, 10, 17))
+        == "(year = '2026' AND month = '10' AND day = '17')"
+    )
+
+
+def test_partition_predicate_across_month():
+    """
+    Days of both months are listed, with zero-padded months and days.
+    """
+    assert partition_predicate(date(2026, 2, 27), date(2026, 3, 2)) == " OR ".join(
+        [
+            "(year = '2026' AND month = '02' AND day = '27')",
+            "(year = '2026' AND month = '02' AND day = '28')",
+            "(year = '2026' AND month = '03' AND day = '01')",
+            "(year = '2026' AND month = '03' AND day = '02')",
+        ]
+    )
+
+
+def test_partition_predicate_across_year():
+    """
+    Days of both years are listed.
+    """
+    assert partition_predicate(date(2025, 12, 30), date(2026, 1, 2)) == " OR ".join(
+        [
+            "(year = '2025' AND month = '12' AND day = '30')",
+            "(year = '2025' AND month = '12' AND day = '31')",
+            "(year = '2026' AND month = '01' AND day = '01')",
+            "(year = '2026' AND month = '01' AND day = '02')",
+        ]
+    )
+
+
+def test_partition_predicate_leap_day():
+    """
+    February 29th of a leap year is a partition.
+    """
+    assert partitions(partition_predicate(date(2028, 2, 28), date(2028, 3, 1))) == [
+        date(2028, 2, 28),
+        date(2028, 2, 29),
+        date(2028, 3, 1),
+    ]
+
+
+def test_partitions_round_trip():
+    """
+    partitions() returns days of partition_predicate() in a query.
+    """
+    start_date, end_date = date(2025, 12, 25), date(2026, 1, 5)
+
+    assert partitions(
+        f"SELECT * FROM raw_events WHERE ({partition_predicate(start_date, end_date)})"
+    ) == [date(2025, 12, 25 + i) for i in range(7)] + [
+        date(2026, 1, 1 + i) for i in range(5)
+    ]
+
+
+def test_normalize_keeps_literals():
+    """
+    Comments, whitespace and trailing semicolon go, string literals stay.
+    """
+    assert (
+        normalize("SELECT *  -- comment\n FROM t\nWHERE name = 'a  b';")
+        == "SELECT * FROM t WHERE name = 'a  b'"
+    )
@@ -0,0 +1,118 @@
+"""
+Tests of users-audiences memberships changes and reset rules.
+"""
+import pytest
+
+import main
+from utils import snapshot, watermarks
+
+
+# Module-private functions of main.
+membership = getattr(main, "__membership")
+reset_audience_names = getattr(main, "__reset_audience_names")
+
+STARTED = 1790000000
+UID_HASH = snapshot.uid_hash("user-1")
+
+
+@pytest.fixture
+def previous_memberships():
+    """
+    Published memberships, some of them over when the run started.
+    """
+    return {
+        "spenders": snapshot.members(
+            [(UID_HASH, STARTED + 100), (snapshot.uid_hash("user-2"), STARTED - 100)]
+        ),
+        "expired": snapshot.members([(UID_HASH, STARTED)]),
+    }
+
+
+@pytest.mark.parametrize(
+    "audience_name,expires_timestamp,expected",
+    [
+        ("spenders", STARTED + 50, ("unchanged", STARTED + 100)),
+        ("spenders", STARTED + 100, ("unchanged", STARTED + 100)),
+        ("spenders", STARTED + 200, ("refreshes", STARTED + 200)),
+        # Not a previous member.
+        ("whales", STARTED + 50, ("inserts", STARTED + 50)),
+        # Previous membership over when the run started.
+        ("expired", STARTED + 50, ("inserts", STARTED + 50)),
+    ],
+)
+def test_membership(previous_memberships, audience_name, expires_timestamp, expected):
+    """
+    A found membership is inserted, refreshed or left unchanged.
+    """
+    assert (
+        membership(
+            previous_memberships, UID_HASH, audience_name, expires_timestamp, STARTED
+        )
+        == expected
+    )
+
+
+def test_membership_of_unknown_uid(previous_memberships):
+    """
+    A uid not published in the audience is inserted.
+    """
+    assert membership(
+        previous_memberships,
+        snapshot.uid_hash("user-3"),
+        "spenders",
+        STARTED + 1,
+        STARTED,
+    ) == ("inserts", STARTED + 1)
+
+
+def test_membership_expired_at_start(previous_memberships):
+    """
+    A membership over when the run started is inserted again.
+    """
+    assert membership(
+        previous_memberships,
+        snapshot.uid_hash("user-2"),
+        "spenders",
+        STARTED + 1,
+        STARTED,
+    ) == ("inserts", STARTED + 1)
+
+
+def __watermark(condition: str) -> dict[str, str]:
+    return {"date": "2026-10-16", "condition": watermarks.condition_hash(condition)}
+
+
+def test_reset_audience_names():
+    """
+    Deleted audiences, and computed ones whose condition changed, are reset.
+    """
+    audiences = {
+        "unchanged": "event_name = 'purchase'",
+        "changed": "event_name = 'level_up'",
+        "changed_not_computed": "event_name = 'login'",
+        "new": "event_name = 'share'",
+    }
+    audiences_watermarks = {
+        "unchanged": __watermark("event_name = 'purchase'"),
+        "changed": __watermark("event_name = 'level_completed'"),
+        "changed_not_computed": __watermark("event_name = 'logout'"),
+        "deleted_with_watermark": __watermark("event_name = 'quit'"),
+    }
+
+    assert reset_audience_names(
+        audiences,
+        audiences_watermarks,
+        ["unchanged", "changed", "changed_not_computed", "deleted"],
+        ["unchanged", "changed", "new"],
+    ) == {"changed", "deleted", "deleted_with_watermark"}
+
+
+def test_reset_audience_names_without_watermarks():
+    """
+    Audiences without watermark are only reset once deleted.
+    """
+    # Audiences published before watermarks existed keep their members.
+    audiences = {"spenders": "event_name = 'purchase'"}
+
+    assert reset_audience_names(audiences, {}, ["spenders"], ["spenders"]) == set()
+    assert reset_audience_names({}, {}, ["spenders"], []) == {"spenders"}
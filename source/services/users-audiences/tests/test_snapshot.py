@@ -0,0 +1,85 @@
+"""
+Tests of users audiences snapshot.
+"""
+from array import array
+import json
+import struct
+
+import pytest
+
+from utils import snapshot
+
+
+def test_dumps_loads_round_trip():
+    """
+    Memberships are loaded back as dumped, with sorted uid hashes.
+    """
+    memberships = {
+        "spenders": snapshot.members(
+            [(snapshot.uid_hash(f"user-{i}"), 1790000000 + i) for i in range(100)]
+        ),
+        "empty": snapshot.members([]),
+        "édition": snapshot.members([(2**64 - 1, 2**32 - 1), (0, 1)]),
+    }
+
+    loaded = snapshot.loads(snapshot.dumps(memberships, version=1790000000))
+
+    assert loaded == memberships
+    for uid_hashes, expires in loaded.values():
+        assert list(uid_hashes) == sorted(uid_hashes)
+        assert len(uid_hashes) == len(expires)
+
+
+def test_dumps_is_little_endian():
+    """
+    Preamble, header and arrays are little-endian, aligned on 8 bytes.
+    """
+    data = snapshot.dumps(
+        {"audience": snapshot.members([(0x0102030405060708, 0x0A0B0C0D)])}, version=7
+    )
+
+    magic, format_version, header_size = struct.unpack_from("<4sII", data)
+    assert (magic, format_version) == (snapshot.MAGIC, snapshot.FORMAT_VERSION)
+    header = json.loads(data[12 : 12 + header_size])
+    assert header == {"version": 7, "audiences": {"audience": [0, 1]}}
+    data_start = 12 + header_size + (-(12 + header_size) % 8)
+    assert data[data_start : data_start + 8] == bytes.fromhex("0807060504030201")
+    assert data[data_start + 8 : data_start + 12] == bytes.fromhex("0d0c0b0a")
+    assert len(data) % 8 == 0
+
+
+def test_loads_unsupported_format():
+    """
+    A snapshot of another format version is rejected.
+    """
+    data = bytearray(snapshot.dumps({}, version=1))
+    struct.pack_into("<I", data, 4, snapshot.FORMAT_VERSION + 1)
+
+    with pytest.raises(ValueError):
+        snapshot.loads(bytes(data))
+
+
+def test_members_keeps_latest_expires():
+    """
+    A uid hash found several times keeps its latest expires timestamp.
+    """
+    uid_hashes, expires = snapshot.members([(5, 10), (3, 7), (5, 12), (5, 11)])
+
+    assert uid_hashes == array("Q", [3, 5])
+    assert expires == array("I", [7, 12])
+
+
+def test_merge():
+    """
+    Merged members keep latest expires timestamps and drop memberships over at <after>.
+    """
+    previous = snapshot.members([(1, 100), (2, 50), (3, 300)])
+    found = snapshot.members([(2, 200), (4, 90), (5, 400)])
+
+    merged = snapshot.merge([previous, found], after=90)
+
+    # 4 expires when the run starts : dropped.
+    assert merged == (array("Q", [1, 2, 3, 5]), array("I", [100, 200, 300, 400]))
+    assert snapshot.expires(merged, 2) == 200
+    assert snapshot.expires(merged, 4) is None
+    assert snapshot.expires(merged, 6) is None
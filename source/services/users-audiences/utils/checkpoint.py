@@ -0,0 +1,174 @@
+"""
+This module contains the checkpoint of a users audiences run, stored as S3 objects
+under a prefix next to users audiences snapshot. A run is split in stages (queries,
+writes, publication) : the checkpoint lets a following invocation continue where the
+last one stopped.
+    run = {"date": "YYYY-MM-DD", "started": int, "audiences": {audience_name: condition},
+           "queries": {name: {"query_ID": str, "start_date": "YYYY-MM-DD",
+                              "audience_names": [str], "query_execution": {...}}}}
+Results of each query are written by their own invocation : their progress is a
+separate object, {"rows": int, "done": bool, "updated": int}, so that parallel
+invocations never write the same object. Each chunk of written rows is saved as a
+partial snapshot (memberships found by this chunk), merged by the publication.
+The publication is split in stages too, by the only invocation which claimed it :
+    publication = {"merged": bool, "segments": {segment: ExclusiveStartKey | None}}
+    claim = {"started": int, "publisher": str, "updated": int} or, once published,
+            {"started": int, "published": true, "updated": int}
+The claim is only replaced if it did not change since it was read (S3 conditional
+writes). The merged snapshot is staged next to the checkpoint until memberships which
+are over are removed, then it is published.
+"""
+import hashlib
+import json
+from typing import Any
+
+from botocore.exceptions import ClientError
+from mypy_boto3_s3.client import S3Client
+
+from utils.s3 import get_body, get_object
+
+
+def run_key(prefix: str) -> str:
+    """
+    This function returns the key of the run checkpoint.
+    """
+    return f"{prefix}run.json"
+
+
+def progress_key(prefix: str, query_name: str) -> str:
+    """
+    This function returns the key of the progress of <query_name> results writes.
+    """
+    return f"{prefix}progress/{__name_hash(query_name)}.json"
+
+
+def partials_prefix(prefix: str) -> str:
+    """
+    This function returns the prefix of partial snapshots of all queries.
+    """
+    return f"{prefix}partial/"
+
+
+def partial_key(prefix: str, query_name: str, row: int) -> str:
+    """
+    This function returns the key of the partial snapshot of <query_name> results
+    chunk ending at <row>. Chunks always end at the same rows : a chunk written again
+    overwrites its partial snapshot.
+    """
+    return f"{partials_prefix(prefix)}{__name_hash(query_name)}/{row:012}.bin"
+
+
+def publication_key(prefix: str) -> str:
+    """
+    This function returns the key of the publication checkpoint.
+    """
+    return f"{prefix}publication.json"
+
+
+def claim_key(prefix: str) -> str:
+    """
+    This function returns the key of the publication claim. It is kept once the run is
+    over : invocations still resuming the run can not claim it anymore.
+    """
+    return f"{prefix}claim.json"
+
+
+def staged_snapshot_key(prefix: str) -> str:
+    """
+    This function returns the key of the merged snapshot, until it is published.
+    """
+    return f"{prefix}snapshot.bin"
+
+
+def download(s3: S3Client, bucket: str, key: str) -> dict[str, Any]:
+    """
+    This function returns a checkpoint object (empty if there is none).
+    """
+    body = get_body(s3, bucket, key)
+    return {} if body is None else json.loads(body)
+
+
+def download_versioned(
+    s3: S3Client, bucket: str, key: str
+) -> tuple[dict[str, Any], str | None]:
+    """
+    This function returns a checkpoint object and its ETag ({} and None if there is none),
+    to be replaced with upload_if_unchanged.
+    """
+    response = get_object(s3, bucket, key)
+    if response is None:
+        return {}, None
+    return json.loads(response["Body"].read()), response["ETag"]
+
+
+def upload(
+    s3: S3Client, bucket: str, key: str, data: dict[str, Any], **conditions: str
+):
+    """
+    This function saves a checkpoint object. <conditions> are passed to PutObject
+    (IfMatch, IfNoneMatch).
+    """
+    s3.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(data, sort_keys=True).encode(),
+        ContentType="application/json",
+        **conditions,
+    )
+
+
+def upload_if_unchanged(
+    s3: S3Client, bucket: str, key: str, data: dict[str, Any], etag: str | None
+) -> bool:
+    """
+    This function saves a checkpoint object only if it is still the one read with <etag>
+    (only if there is none, if <etag> is None), and returns False if it changed.
+    """
+    try:
+        upload(
+            s3,
+            bucket,
+            key,
+            data,
+            **({"IfMatch": etag} if etag else {"IfNoneMatch": "*"}),
+        )
+    except ClientError as e:
+        # 409 ConditionalRequestConflict : a concurrent conditional write of the object.
+        if e.response["Error"]["Code"] in (
+            "PreconditionFailed",
+            "ConditionalRequestConflict",
+        ):
+            return False
+        raise
+    return True
+
+
+def keys(s3: S3Client, bucket: str, prefix: str) -> list[str]:
+    """
+    This function returns keys of checkpoint objects under <prefix>.
+    """
+    return [
+        content["Key"]
+        for page in s3.get_paginator("list_objects_v2").paginate(
+            Bucket=bucket, Prefix=prefix
+        )
+        for content in page.get("Contents", [])
+    ]
+
+
+def delete(s3: S3Client, bucket: str, prefix: str):
+    """
+    This function deletes all checkpoint objects but the claim : the run is over.
+    """
+    objects = [
+        {"Key": key} for key in keys(s3, bucket, prefix) if key != claim_key(prefix)
+    ]
+    # DeleteObjects accepts up to 1000 keys.
+    for i in range(0, len(objects), 1000):
+        s3.delete_objects(
+            Bucket=bucket, Delete={"Objects": objects[i : i + 1000], "Quiet": True}
+        )
+
+
+def __name_hash(query_name: str) -> str:
+    return hashlib.blake2b(query_name.encode(), digest_size=16).hexdigest()
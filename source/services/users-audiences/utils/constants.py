@@ -4,9 +4,20 @@ This module contains constants.
 import os
 
 
+FUNCTION_NAME = os.environ["AWS_LAMBDA_FUNCTION_NAME"]
+FUNCTION_ARN = os.environ["FUNCTION_ARN"]
+# One-shot EventBridge schedules resuming runs (and the role they invoke the function with).
+RESUME_SCHEDULE_GROUP = os.environ["RESUME_SCHEDULE_GROUP"]
+RESUME_SCHEDULER_ROLE_ARN = os.environ["RESUME_SCHEDULER_ROLE_ARN"]
+
 ANALYTICS_BUCKET = os.environ["ANALYTICS_BUCKET"]
 ANALYTICS_DATABASE = os.environ["ANALYTICS_DATABASE"]
 ANALYTICS_TABLE = os.environ["ANALYTICS_TABLE"]
+# Reruns after a failure reuse audiences queries results up to this age.
+ATHENA_RESULTS_MAX_AGE_MINUTES = 60
 
 AUDIENCES_TABLE = os.environ["AUDIENCES_TABLE"]
 USERS_AUDIENCES_TABLE = os.environ["USERS_AUDIENCES_TABLE"]
+USERS_AUDIENCES_CHECKPOINT_PREFIX = os.environ["USERS_AUDIENCES_CHECKPOINT_PREFIX"]
+USERS_AUDIENCES_SNAPSHOT_KEY = os.environ["USERS_AUDIENCES_SNAPSHOT_KEY"]
+USERS_AUDIENCES_WATERMARKS_KEY = os.environ["USERS_AUDIENCES_WATERMARKS_KEY"]
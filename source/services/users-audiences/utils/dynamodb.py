@@ -0,0 +1,138 @@
+"""
+This module contains DynamoDB helpers for large tables.
+Requests are split in segments, processed by parallel threads with a shared client
+(boto3 clients are thread-safe).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import threading
+from time import monotonic, sleep
+from typing import Any, Callable
+
+from botocore.exceptions import ClientError
+from mypy_boto3_dynamodb.client import DynamoDBClient
+
+
+BATCH_WRITE_ITEM_LIMIT = 25
+THROTTLING_ERRORS = (
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "ThrottlingException",
+)
+
+
+@dataclass(frozen=True)
+class Parallelism:
+    """
+    This class represents how parallel requests share a table throughput : they are
+    split in <segments> segments, processed by parallel threads. When a thread is
+    throttled, every thread backs off : from <backoff_seconds>, doubled while throttling
+    goes on, up to <max_backoff_seconds>.
+    """
+
+    segments: int = 8
+    backoff_seconds: float = 0.05
+    max_backoff_seconds: float = 5.0
+
+
+PARALLELISM = Parallelism()
+
+
+def batch_write(
+    dynamodb: DynamoDBClient,
+    table_name: str,
+    requests: list[dict[str, Any]],
+    parallelism: Parallelism = PARALLELISM,
+):
+    """
+    This function applies write <requests> ({"PutRequest": ...} or {"DeleteRequest": ...})
+    to <table_name> with parallel batch writers (see Parallelism).
+    UnprocessedItems are retried. When a writer is throttled, every writer backs off :
+    parallelism never adds pressure on a table that already can not keep up.
+    """
+    lock = threading.Lock()
+    backoff = {"retries": 0, "until": 0.0}
+
+    def throttled():
+        with lock:
+            backoff["retries"] += 1
+            backoff["until"] = monotonic() + min(
+                parallelism.backoff_seconds * 2 ** backoff["retries"],
+                parallelism.max_backoff_seconds,
+            )
+
+    def write_segment(segment: list[dict[str, Any]]):
+        for i in range(0, len(segment), BATCH_WRITE_ITEM_LIMIT):
+            request_items = {table_name: segment[i : i + BATCH_WRITE_ITEM_LIMIT]}
+            while request_items:
+                if (delay := backoff["until"] - monotonic()) > 0:
+                    sleep(delay)
+                try:
+                    response = dynamodb.batch_write_item(RequestItems=request_items)
+                except ClientError as e:
+                    if e.response["Error"]["Code"] not in THROTTLING_ERRORS:
+                        raise
+                    throttled()
+                    continue
+
+                if response.get("UnprocessedItems"):
+                    request_items = response["UnprocessedItems"]
+                    throttled()
+                else:
+                    request_items = {}
+                    with lock:
+                        backoff["retries"] = 0
+
+    segments = parallelism.segments
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        # list() re-raises the first error of any writer.
+        list(
+            executor.map(
+                write_segment,
+                (requests[segment::segments] for segment in range(segments)),
+            )
+        )
+
+
+def parallel_scan(
+    dynamodb: DynamoDBClient,
+    table_name: str,
+    process: Callable[[list[dict[str, Any]]], None],
+    start_keys: dict[str, Any],
+    deadline: float,
+    **kwargs: Any,
+) -> dict[str, Any]:
+    """
+    This function calls <process> with items of each page of <table_name>, read by a
+    parallel scan (<process> is called by parallel threads). Segments are always those
+    of PARALLELISM : they are part of the scan progress.
+    Segments start from <start_keys> (segment -> ExclusiveStartKey, or None once the
+    segment is scanned), returned by a previous call. Pages are read until <deadline>
+    (monotonic) : the returned progress lets a following call continue the scan.
+    <kwargs> are passed to each Scan request (e.g. FilterExpression).
+    """
+    segments = PARALLELISM.segments
+
+    def scan_segment(segment: int) -> dict[str, Any] | None:
+        request = kwargs | {"Segment": segment, "TotalSegments": segments}
+        if start_key := start_keys.get(str(segment)):
+            request["ExclusiveStartKey"] = start_key
+        # At least a page is read by each call : the scan always moves on.
+        while True:
+            response = dynamodb.scan(TableName=table_name, **request)
+            process(response["Items"])
+            if "LastEvaluatedKey" not in response:
+                return None
+            request["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            if monotonic() >= deadline:
+                return request["ExclusiveStartKey"]
+
+    pending = [
+        segment
+        for segment in range(segments)
+        if str(segment) not in start_keys or start_keys[str(segment)] is not None
+    ]
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        return start_keys | dict(
+            zip(map(str, pending), executor.map(scan_segment, pending))
+        )
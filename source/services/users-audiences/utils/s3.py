@@ -0,0 +1,26 @@
+"""
+This module contains S3 helpers.
+"""
+from botocore.exceptions import ClientError
+from mypy_boto3_s3.client import S3Client
+from mypy_boto3_s3.type_defs import GetObjectOutputTypeDef
+
+
+def get_object(s3: S3Client, bucket: str, key: str) -> GetObjectOutputTypeDef | None:
+    """
+    This function returns the GetObject response of <key>, or None if there is none.
+    """
+    try:
+        return s3.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+
+
+def get_body(s3: S3Client, bucket: str, key: str) -> bytes | None:
+    """
+    This function returns the content of object <key>, or None if there is none.
+    """
+    response = get_object(s3, bucket, key)
+    return None if response is None else response["Body"].read()
@@ -0,0 +1,174 @@
+"""
+This module contains the users audiences snapshot, published for remote-configs Lambda.
+It answers event_based memberships without querying users-audiences table.
+
+Layout (little-endian) :
+    b"GUAS" | format version (uint32) | header size (uint32) | header (JSON) | padding
+    header = {"version": int, "audiences": {audience_name: [offset, count]}}
+    Then for each audience, at <offset> bytes from the end of padding :
+    uid hashes (uint64, sorted) | expires timestamps (uint32) | padding
+Everything is aligned on 8 bytes.
+Keep in sync with remote-configs models/UsersAudiencesSnapshot.py.
+
+Members of an audience are kept as in the snapshot : (sorted uid hashes, expires
+timestamps) arrays. Merges stream sorted arrays instead of
+building dicts : a membership takes 12 bytes (and about 50 bytes while new memberships
+are sorted). Snapshot memory is bounded by Lambda MemorySize : UsersAudiencesFunction
+(1024 MB) publishes up to about 20 millions memberships, RemoteConfigsFunction (256 MB)
+reads up to about 10 millions memberships.
+"""
+from array import array
+from bisect import bisect_left
+import hashlib
+from heapq import merge as heap_merge
+import json
+import struct
+import sys
+from typing import Iterable, Iterator
+
+from mypy_boto3_s3.client import S3Client
+
+from utils.s3 import get_body
+
+
+MAGIC = b"GUAS"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("<4sII")
+
+# (sorted uid hashes, expires timestamps) of an audience.
+Members = tuple[array, array]
+
+
+def uid_hash(uid: str) -> int:
+    """
+    This function returns the 64 bits hash of uid stored in snapshot.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(uid.encode(), digest_size=8).digest(), "little"
+    )
+
+
+def members(memberships: Iterable[tuple[int, int]]) -> Members:
+    """
+    This function returns Members of (uid hash, expires timestamp) <memberships>, in
+    any order. A uid hash found several times keeps its latest expires timestamp.
+    """
+    # uid hash and expires timestamp are packed in one int : sorted by hash, then expires.
+    packed = sorted(
+        hash_ << 32 | expires_timestamp for hash_, expires_timestamp in memberships
+    )
+    return __members((value >> 32, value & 0xFFFFFFFF) for value in packed)
+
+
+def merge(members_list: Iterable[Members], after: int = 0) -> Members:
+    """
+    This function returns Members of all <members_list>, merged without any dict.
+    A uid hash found several times keeps its latest expires timestamp, and memberships
+    expiring before <after> (included) are dropped.
+    """
+    return __members(
+        (hash_, expires_timestamp)
+        for hash_, expires_timestamp in heap_merge(
+            *(zip(uid_hashes, expires) for uid_hashes, expires in members_list)
+        )
+        if expires_timestamp > after
+    )
+
+
+def expires(audience_members: Members, hash_: int) -> int | None:
+    """
+    This function returns the expires timestamp of <hash_> in <audience_members>,
+    or None if it is not a member.
+    """
+    uid_hashes, expires_timestamps = audience_members
+    i = bisect_left(uid_hashes, hash_)
+    if i < len(uid_hashes) and uid_hashes[i] == hash_:
+        return expires_timestamps[i]
+    return None
+
+
+def dumps(memberships: dict[str, Members], version: int) -> bytes:
+    """
+    This function returns the snapshot of <memberships> (audience_name -> Members).
+    """
+    data = bytearray()
+    audiences = {}
+    for audience_name, (uid_hashes, expires_timestamps) in sorted(memberships.items()):
+        audiences[audience_name] = [len(data), len(uid_hashes)]
+        data += __little_endian(array("Q", uid_hashes)).tobytes()
+        data += __little_endian(array("I", expires_timestamps)).tobytes()
+        data += bytes(-len(data) % 8)
+
+    header = json.dumps({"version": version, "audiences": audiences}).encode()
+    preamble = PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)) + header
+    return preamble + bytes(-len(preamble) % 8) + data
+
+
+def loads(snapshot: bytes) -> dict[str, Members]:
+    """
+    This function returns memberships (audience_name -> Members) of <snapshot>.
+    """
+    magic, format_version, header_size = PREAMBLE.unpack_from(snapshot)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot (format version {format_version})")
+
+    header = json.loads(snapshot[PREAMBLE.size : PREAMBLE.size + header_size])
+    data_start = PREAMBLE.size + header_size
+    data_start += -data_start % 8
+
+    memberships = {}
+    for audience_name, (offset, count) in header["audiences"].items():
+        start = data_start + offset
+        memberships[audience_name] = (
+            __little_endian(array("Q", snapshot[start : start + 8 * count])),
+            __little_endian(
+                array("I", snapshot[start + 8 * count : start + 12 * count])
+            ),
+        )
+    return memberships
+
+
+def download(s3: S3Client, bucket: str, key: str) -> dict[str, Members]:
+    """
+    This function returns memberships of the published snapshot (empty if there is none).
+    """
+    body = get_body(s3, bucket, key)
+    return {} if body is None else loads(body)
+
+
+def upload(
+    s3: S3Client,
+    bucket: str,
+    key: str,
+    memberships: dict[str, Members],
+    version: int,
+):
+    """
+    This function publishes the snapshot of <memberships>.
+    """
+    s3.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=dumps(memberships, version),
+        Metadata={"version": str(version)},
+    )
+
+
+def __little_endian(values: array) -> array:
+    # Arrays use the native byte order : swapped in place on big-endian platforms.
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def __members(sorted_memberships: Iterator[tuple[int, int]]) -> Members:
+    # Memberships are sorted by uid hash, then expires : the last one of a hash wins.
+    uid_hashes = array("Q")
+    expires_timestamps = array("I")
+    for hash_, expires_timestamp in sorted_memberships:
+        if uid_hashes and uid_hashes[-1] == hash_:
+            expires_timestamps[-1] = max(expires_timestamps[-1], expires_timestamp)
+        else:
+            uid_hashes.append(hash_)
+            expires_timestamps.append(expires_timestamp)
+    return uid_hashes, expires_timestamps
@@ -0,0 +1,134 @@
+"""
+This module contains a lightweight tracing layer.
+Every boto3 API call (see trace_boto3) and every block wrapped by trace() is timed.
+At the end of each invocation, traced_handler prints one CloudWatch Embedded Metric
+Format (EMF) record with durations and calls by dependency, and cache hit ratios.
+The same module is used by every Python Lambda : keep copies in sync.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+import json
+import os
+import threading
+from time import perf_counter, time
+from typing import Any, Callable, Iterator
+
+
+NAMESPACE = "GameAnalyticsPipeline"
+
+__lock = threading.Lock()
+# dependency -> [calls, duration (ms)]
+__dependencies: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+# cache name -> [hits, lookups]
+__caches: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+
+
+def record(dependency: str, duration_ms: float):
+    """
+    This function records a call to <dependency> that lasted <duration_ms>.
+    """
+    with __lock:
+        counters = __dependencies[dependency]
+        counters[0] += 1
+        counters[1] += duration_ms
+
+
+def record_cache(cache_name: str, hit: bool):
+    """
+    This function records a lookup in <cache_name> cache.
+    """
+    with __lock:
+        counters = __caches[cache_name]
+        counters[0] += hit
+        counters[1] += 1
+
+
+@contextmanager
+def trace(dependency: str) -> Iterator[None]:
+    """
+    This context manager records the duration of its block as a call to <dependency>.
+    """
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record(dependency, (perf_counter() - start) * 1000)
+
+
+def trace_boto3(boto3_object: Any) -> Any:
+    """
+    This function times every API call of a boto3 session, client or resource
+    (as "<service>.<operation>" dependency) and returns it.
+    Sessions must be traced before creating their clients and resources.
+    """
+    meta = getattr(boto3_object, "meta", None)
+    events = (
+        boto3_object.events
+        if meta is None
+        else getattr(meta, "client", boto3_object).meta.events
+    )
+    events.register("before-call", __before_call)
+    events.register("after-call", __after_call)
+    events.register("after-call-error", __after_call)
+    return boto3_object
+
+
+def traced_handler(handler: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    """
+    This decorator prints the EMF record of each invocation of lambda <handler>.
+    """
+
+    @wraps(handler)
+    def wrapper(event: Any, context: Any) -> Any:
+        with __lock:
+            __dependencies.clear()
+            __caches.clear()
+        start = perf_counter()
+        try:
+            return handler(event, context)
+        finally:
+            print(json.dumps(__emf_record((perf_counter() - start) * 1000)))
+
+    return wrapper
+
+
+def __before_call(context: dict[str, Any], **_):
+    context["tracing_start"] = perf_counter()
+
+
+def __after_call(event_name: str, context: dict[str, Any], **_):
+    if "tracing_start" in context:
+        _, service, operation = event_name.split(".")[:3]
+        record(
+            f"{service}.{operation}",
+            (perf_counter() - context.pop("tracing_start")) * 1000,
+        )
+
+
+def __emf_record(duration_ms: float) -> dict[str, Any]:
+    metrics: dict[str, tuple[float, str]] = {"Duration": (duration_ms, "Milliseconds")}
+    with __lock:
+        for dependency, (calls, duration) in sorted(__dependencies.items()):
+            metrics[f"{dependency}.Calls"] = (calls, "Count")
+            metrics[f"{dependency}.Duration"] = (duration, "Milliseconds")
+        for cache_name, (hits, lookups) in sorted(__caches.items()):
+            metrics[f"{cache_name}.CacheHitRatio"] = (hits / lookups * 100, "Percent")
+
+    return {
+        "_aws": {
+            "Timestamp": int(time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": NAMESPACE,
+                    "Dimensions": [["FunctionName"]],
+                    "Metrics": [
+                        {"Name": name, "Unit": unit}
+                        for name, (_, unit) in metrics.items()
+                    ],
+                }
+            ],
+        },
+        "FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local"),
+    } | {name: round(value, 3) for name, (value, _) in metrics.items()}
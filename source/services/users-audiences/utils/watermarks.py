@@ -0,0 +1,58 @@
+"""
+This module contains event_based audiences watermarks, stored as JSON next to users
+audiences snapshot : {audience_name: {"date": "YYYY-MM-DD", "condition": str}}.
+"date" is the last events partition scanned for the audience by a successful run,
+"condition" is the hash of the audience condition at that time.
+"""
+from datetime import date
+import hashlib
+import json
+
+from mypy_boto3_s3.client import S3Client
+
+from utils.s3 import get_body
+
+
+def condition_hash(condition: str) -> str:
+    """
+    This function returns the hash of an audience <condition> stored in watermarks.
+    """
+    return hashlib.blake2b(condition.encode(), digest_size=16).hexdigest()
+
+
+def download(s3: S3Client, bucket: str, key: str) -> dict[str, dict[str, str]]:
+    """
+    This function returns published watermarks (empty if there are none).
+    """
+    body = get_body(s3, bucket, key)
+    return {} if body is None else json.loads(body)
+
+
+def start_date(
+    watermarks: dict[str, dict[str, str]],
+    audience_name: str,
+    condition: str,
+    window_start: date,
+) -> date:
+    """
+    This function returns the first events partition to scan for an audience.
+    The partition of its watermark is scanned again (it was not complete), unless it is
+    older than <window_start>. Audiences without watermark, or whose condition changed,
+    are computed again from <window_start>.
+    """
+    watermark = watermarks.get(audience_name)
+    if not watermark or watermark["condition"] != condition_hash(condition):
+        return window_start
+    return max(date.fromisoformat(watermark["date"]), window_start)
+
+
+def upload(s3: S3Client, bucket: str, key: str, watermarks: dict[str, dict[str, str]]):
+    """
+    This function publishes <watermarks>.
+    """
+    s3.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(watermarks, sort_keys=True).encode(),
+        ContentType="application/json",
+    )